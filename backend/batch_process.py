@@ -0,0 +1,340 @@
+"""
+Offline bulk detection for directories of images and videos.
+
+Walks a directory tree and runs the detector over every supported file in
+parallel worker processes, without going through the HTTP API. Images are
+inferred in batches inside each worker. Detections are appended to an NDJSON
+results file, one line per input file, and finished files are recorded in a
+manifest so an interrupted run can be resumed by running the same command.
+
+Usage:
+    python batch_process.py /data/dashcam/2024-05-01 --output results.ndjson --workers 4
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+
+import config
+import cv2
+from utils.model_variants import MODEL_VARIANTS, ensure_variant
+
+# Detector owned by each worker process, created by _init_worker
+_detector = None
+_options = {}
+
+
+def file_key(path: Path, root: Path) -> Dict:
+    """Identity of an input file, used to detect already-processed files."""
+    stat = path.stat()
+    return {
+        "path": path.relative_to(root).as_posix(),
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+    }
+
+
+def load_manifest(manifest_path: Path) -> Set[tuple]:
+    """Read the keys of files completed by previous runs."""
+    done = set()
+    if not manifest_path.exists():
+        return done
+
+    with manifest_path.open() as manifest:
+        for line in manifest:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # Partial line from an interrupted run
+            done.add((entry["path"], entry["size"], entry["mtime_ns"]))
+    return done
+
+
+def find_inputs(root: Path):
+    """Split the supported files under root into images and videos."""
+    images, videos = [], []
+    for path in sorted(root.rglob("*")):
+        if not path.is_file():
+            continue
+        suffix = path.suffix.lower()
+        if suffix in config.SUPPORTED_IMAGE_FORMATS:
+            images.append(path)
+        elif suffix in config.SUPPORTED_VIDEO_FORMATS:
+            videos.append(path)
+    return images, videos
+
+
+def _init_worker(options: Dict):
+    """Load the model once per worker process (the variant is already built)."""
+    global _detector, _options
+
+    from utils.detector import RoadHazardDetector
+
+    _options = options
+    _detector = RoadHazardDetector(variant=options["variant"])
+    # Split CPU cores between workers instead of every worker using all of them
+    _detector.set_num_threads(options["threads_per_worker"])
+
+
+def _annotated_path(rel_path: str, suffix: Optional[str] = None) -> Optional[Path]:
+    """Output path for an annotated file, mirroring the input tree."""
+    if not _options["annotate_dir"]:
+        return None
+    path = Path(_options["annotate_dir"]) / rel_path
+    if suffix:
+        path = path.with_suffix(suffix)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def _process_images(keys: List[Dict]) -> List[Dict]:
+    """Worker task: detect hazards in a batch of images."""
+    root = Path(_options["input_dir"])
+    records, images, loaded = [], [], []
+
+    for key in keys:
+        image = cv2.imread(str(root / key["path"]))
+        if image is None:
+            records.append({**key, "type": "image", "error": "Failed to read image"})
+            continue
+        images.append(image)
+        loaded.append(key)
+
+    if images:
+        batch = _detector.predict_candidates_batch(images)
+        for key, image, candidates in zip(loaded, images, batch):
+            detections = _detector.filter_candidates(
+                candidates, _options["conf"], _options["iou"]
+            )
+
+            output_path = _annotated_path(key["path"])
+            if output_path:
+                cv2.imwrite(
+                    str(output_path), _detector.draw_detections(image, detections)
+                )
+
+            records.append(
+                {
+                    **key,
+                    "type": "image",
+                    "width": image.shape[1],
+                    "height": image.shape[0],
+                    "detections": detections,
+                    "total_detections": len(detections),
+                }
+            )
+
+    return records
+
+
+def _process_video(key: Dict) -> List[Dict]:
+    """Worker task: detect hazards in one video."""
+    root = Path(_options["input_dir"])
+    output_path = _annotated_path(key["path"], suffix=".mp4")
+
+    try:
+        detections = _detector.detect_video(
+            str(root / key["path"]),
+            str(output_path) if output_path else None,
+            frame_stride=_options["frame_stride"],
+            max_width=_options["max_width"],
+            conf=_options["conf"],
+            iou=_options["iou"],
+            decode_threads=_options["threads_per_worker"],
+        )
+    except Exception as e:
+        return [{**key, "type": "video", "error": str(e)}]
+
+    return [
+        {
+            **key,
+            "type": "video",
+            "detections": detections,
+            "total_detections": len(detections),
+        }
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("input_dir", help="Directory tree of images and videos")
+    parser.add_argument(
+        "--output",
+        default="batch_results.ndjson",
+        help="NDJSON results file, appended to (default: batch_results.ndjson)",
+    )
+    parser.add_argument(
+        "--manifest",
+        help="Manifest of completed files (default: <output>.manifest)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Number of worker processes (default: one per CPU core)",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=8,
+        help="Images per worker task (batched inference with the fp32 variant only)",
+    )
+    parser.add_argument(
+        "--annotate-dir", help="Also write annotated images/videos to this directory"
+    )
+    parser.add_argument(
+        "--variant",
+        default=config.MODEL_VARIANT,
+        help=f"Model variant (default: {config.MODEL_VARIANT})",
+    )
+    parser.add_argument("--conf", type=float, help="Confidence threshold")
+    parser.add_argument("--iou", type=float, help="NMS IoU threshold")
+    parser.add_argument(
+        "--frame-stride", type=int, help="Process every Nth video frame"
+    )
+    parser.add_argument(
+        "--max-width", type=int, help="Downscale wider video frames while decoding"
+    )
+    args = parser.parse_args()
+
+    if args.conf is not None and args.conf < config.RAW_CONFIDENCE_FLOOR:
+        parser.error(f"--conf must be at least {config.RAW_CONFIDENCE_FLOOR}")
+    if args.variant not in MODEL_VARIANTS:
+        parser.error(
+            f"unknown --variant '{args.variant}', choose from {MODEL_VARIANTS}"
+        )
+    for name in ("workers", "batch_size", "frame_stride"):
+        value = getattr(args, name)
+        if value is not None and value < 1:
+            parser.error(f"--{name.replace('_', '-')} must be at least 1")
+    if args.max_width is not None and args.max_width < 0:
+        parser.error("--max-width must be 0 (source size) or more")
+
+    input_dir = Path(args.input_dir).resolve()
+    if not input_dir.is_dir():
+        print(f"✗ Input directory not found: {input_dir}")
+        sys.exit(1)
+    if not config.MODEL_PATH.exists():
+        print(f"✗ Model file not found at {config.MODEL_PATH}")
+        sys.exit(1)
+
+    output_path = Path(args.output)
+    manifest_path = Path(args.manifest or f"{args.output}.manifest")
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    manifest_path.parent.mkdir(parents=True, exist_ok=True)
+
+    # Skip files completed by earlier runs (unchanged size and mtime)
+    done = load_manifest(manifest_path)
+    images, videos = find_inputs(input_dir)
+    pending_images, pending_videos = [], []
+    for paths, pending in ((images, pending_images), (videos, pending_videos)):
+        for path in paths:
+            key = file_key(path, input_dir)
+            if (key["path"], key["size"], key["mtime_ns"]) not in done:
+                pending.append(key)
+
+    total = len(pending_images) + len(pending_videos)
+    skipped = len(images) + len(videos) - total
+    print(
+        f"✓ Found {len(images)} images and {len(videos)} videos "
+        f"({skipped} already done, {total} to process)"
+    )
+    if total == 0:
+        return
+
+    # Build the export once here; workers exporting concurrently would
+    # overwrite and delete each other's files
+    try:
+        ensure_variant(
+            str(config.MODEL_PATH),
+            args.variant,
+            calibration_dir=config.QUANT_CALIBRATION_DIR or None,
+        )
+    except Exception as e:
+        print(f"✗ Failed to build '{args.variant}' model variant: {e}")
+        sys.exit(1)
+
+    workers = max(1, min(args.workers, total))
+    options = {
+        "input_dir": str(input_dir),
+        "annotate_dir": args.annotate_dir,
+        "variant": args.variant,
+        "conf": args.conf,
+        "iou": args.iou,
+        "frame_stride": args.frame_stride,
+        "max_width": args.max_width,
+        "threads_per_worker": max(1, (os.cpu_count() or 1) // workers),
+    }
+
+    completed = failed = 0
+    start = time.perf_counter()
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(options,),
+    ) as pool, output_path.open("a") as results, manifest_path.open("a") as manifest:
+        # Videos first: they are the longest tasks, so start them early
+        futures = {pool.submit(_process_video, key): [key] for key in pending_videos}
+        for i in range(0, len(pending_images), args.batch_size):
+            batch = pending_images[i : i + args.batch_size]
+            futures[pool.submit(_process_images, batch)] = batch
+
+        for future in as_completed(futures):
+            try:
+                records = future.result()
+            except Exception as e:
+                # A crashed task is retried on the next run
+                paths = ", ".join(key["path"] for key in futures[future])
+                print(f"✗ Worker task failed ({paths}): {e!r}")
+                failed += len(futures[future])
+                continue
+
+            processed_at = datetime.now().isoformat()
+            for record in records:
+                record["processed_at"] = processed_at
+                results.write(json.dumps(record) + "\n")
+            results.flush()
+
+            # Only mark files done once their results are on disk
+            for record in records:
+                if "error" in record:
+                    failed += 1
+                    print(f"✗ {record['path']}: {record['error']}")
+                    continue
+
+                completed += 1
+                manifest.write(
+                    json.dumps(
+                        {
+                            "path": record["path"],
+                            "size": record["size"],
+                            "mtime_ns": record["mtime_ns"],
+                        }
+                    )
+                    + "\n"
+                )
+                print(
+                    f"[{completed + failed}/{total}] {record['path']}: "
+                    f"{record['total_detections']} detections"
+                )
+            manifest.flush()
+
+    elapsed = time.perf_counter() - start
+    print(
+        f"\n✓ Processed {completed} files in {elapsed:.1f}s "
+        f"({completed / elapsed:.1f} files/s), {failed} failed"
+    )
+    print(f"✓ Results appended to {output_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,334 @@
+"""
+Offline accuracy-vs-speed benchmark for the reduced-precision model variants.
+
+Runs a labelled local image set (YOLO-format .txt labels) through each model
+variant and reports latency, throughput and per-class mAP side by side, then
+picks the fastest variant that still meets the accuracy floor.
+
+Usage:
+    python benchmark_variants.py --images dataset/images --min-map 0.6
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import config
+import cv2
+import numpy as np
+from utils.detector import RoadHazardDetector
+from utils.model_variants import MODEL_VARIANTS
+
+IOU_THRESHOLDS = np.linspace(0.5, 0.95, 10)
+EVAL_CONFIDENCE = 0.001  # Standard low threshold so the PR curve is complete
+
+# np.trapz was renamed to np.trapezoid in NumPy 2.0 and later removed
+_trapezoid = getattr(np, "trapezoid", None) or np.trapz
+
+
+def load_dataset(images_dir: Path, labels_dir: Path) -> List[Dict]:
+    """Load images and their ground-truth boxes (pixel xyxy) into memory."""
+    samples = []
+    for image_path in sorted(images_dir.rglob("*")):
+        if image_path.suffix.lower() not in config.SUPPORTED_IMAGE_FORMATS:
+            continue
+
+        image = cv2.imread(str(image_path))
+        if image is None:
+            print(f"⚠ Skipping unreadable image: {image_path}")
+            continue
+        height, width = image.shape[:2]
+
+        boxes, classes = [], []
+        label_path = labels_dir / image_path.relative_to(images_dir).with_suffix(
+            ".txt"
+        )
+        if label_path.exists():
+            for line in label_path.read_text().splitlines():
+                parts = line.split()
+                if len(parts) < 5:
+                    continue
+                cls_id, cx, cy, w, h = int(parts[0]), *map(float, parts[1:5])
+                classes.append(cls_id)
+                boxes.append(
+                    [
+                        (cx - w / 2) * width,
+                        (cy - h / 2) * height,
+                        (cx + w / 2) * width,
+                        (cy + h / 2) * height,
+                    ]
+                )
+
+        samples.append(
+            {
+                "path": image_path,
+                "image": image,
+                "gt_boxes": np.array(boxes, dtype=np.float32).reshape(-1, 4),
+                "gt_classes": np.array(classes, dtype=np.int64),
+            }
+        )
+    return samples
+
+
+def box_iou(boxes_a: np.ndarray, boxes_b: np.ndarray) -> np.ndarray:
+    """Pairwise IoU between two sets of xyxy boxes."""
+    top_left = np.maximum(boxes_a[:, None, :2], boxes_b[None, :, :2])
+    bottom_right = np.minimum(boxes_a[:, None, 2:], boxes_b[None, :, 2:])
+    inter = np.prod(np.clip(bottom_right - top_left, 0, None), axis=2)
+    area_a = np.prod(boxes_a[:, 2:] - boxes_a[:, :2], axis=1)
+    area_b = np.prod(boxes_b[:, 2:] - boxes_b[:, :2], axis=1)
+    return inter / (area_a[:, None] + area_b[None, :] - inter + 1e-9)
+
+
+def average_precision(recall: np.ndarray, precision: np.ndarray) -> float:
+    """COCO-style 101-point interpolated AP."""
+    mrec = np.concatenate(([0.0], recall, [1.0]))
+    mpre = np.concatenate(([1.0], precision, [0.0]))
+    mpre = np.flip(np.maximum.accumulate(np.flip(mpre)))
+    x = np.linspace(0, 1, 101)
+    return float(_trapezoid(np.interp(x, mrec, mpre), x))
+
+
+def class_map(samples: List[Dict], predictions: List[Dict], class_id: int) -> Dict:
+    """Compute mAP@0.5 and mAP@0.5:0.95 for a single class."""
+    scores, true_positives = [], []
+    num_gt = 0
+
+    for sample, pred in zip(samples, predictions):
+        gt = sample["gt_boxes"][sample["gt_classes"] == class_id]
+        keep = pred["classes"] == class_id
+        boxes, confs = pred["boxes"][keep], pred["confs"][keep]
+        order = np.argsort(-confs)
+        boxes, confs = boxes[order], confs[order]
+        num_gt += len(gt)
+
+        tp = np.zeros((len(boxes), len(IOU_THRESHOLDS)), dtype=bool)
+        if len(boxes) and len(gt):
+            ious = box_iou(boxes, gt)
+            for t, threshold in enumerate(IOU_THRESHOLDS):
+                matched = np.zeros(len(gt), dtype=bool)
+                for i in range(len(boxes)):
+                    candidates = np.where((ious[i] >= threshold) & ~matched)[0]
+                    if len(candidates):
+                        best = candidates[np.argmax(ious[i, candidates])]
+                        matched[best] = True
+                        tp[i, t] = True
+
+        scores.append(confs)
+        true_positives.append(tp)
+
+    if num_gt == 0:
+        return {"map50": None, "map50_95": None, "instances": 0}
+
+    scores = np.concatenate(scores)
+    true_positives = np.concatenate(true_positives).reshape(-1, len(IOU_THRESHOLDS))
+    order = np.argsort(-scores)
+    tp_cum = np.cumsum(true_positives[order], axis=0)
+    fp_cum = np.cumsum(~true_positives[order], axis=0)
+
+    aps = []
+    for t in range(len(IOU_THRESHOLDS)):
+        recall = tp_cum[:, t] / num_gt
+        precision = tp_cum[:, t] / np.maximum(tp_cum[:, t] + fp_cum[:, t], 1e-9)
+        aps.append(average_precision(recall, precision))
+
+    return {
+        "map50": aps[0],
+        "map50_95": float(np.mean(aps)),
+        "instances": num_gt,
+    }
+
+
+def benchmark_variant(
+    variant: str, samples: List[Dict], class_names: List[str], warmup: int
+) -> Dict:
+    """Run every sample through one variant and collect speed and accuracy."""
+    detector = RoadHazardDetector(variant=variant)
+    name_to_id = {name: cls_id for cls_id, name in detector.model.names.items()}
+
+    def serve(image: np.ndarray):
+        # Same path the server runs for uploads: candidates, then filtering
+        candidates = detector.predict_candidates(image)
+        return detector.filter_candidates(candidates)
+
+    for sample in samples[:warmup]:
+        serve(sample["image"])
+
+    # Speed: timed pass through the serving path at the configured thresholds
+    latencies = []
+    for sample in samples:
+        start = time.perf_counter()
+        serve(sample["image"])
+        latencies.append(time.perf_counter() - start)
+
+    # Accuracy: separate untimed pass at a low threshold for a full PR curve
+    predictions = []
+    for sample in samples:
+        results = detector.predict(
+            sample["image"], conf=EVAL_CONFIDENCE, iou=detector.iou_threshold
+        )
+        boxes = results[0].boxes
+        predictions.append(
+            {
+                "boxes": boxes.xyxy.cpu().numpy(),
+                "confs": boxes.conf.cpu().numpy(),
+                "classes": boxes.cls.cpu().numpy().astype(np.int64),
+            }
+        )
+
+    latencies_ms = np.array(latencies) * 1000
+    report = {
+        "variant": variant,
+        "latency_ms_mean": float(latencies_ms.mean()),
+        "latency_ms_p50": float(np.percentile(latencies_ms, 50)),
+        "latency_ms_p95": float(np.percentile(latencies_ms, 95)),
+        "throughput_fps": float(len(samples) / sum(latencies)),
+        "classes": {},
+    }
+    for class_name in class_names:
+        if class_name not in name_to_id:
+            print(f"⚠ Class '{class_name}' not in model classes, skipping")
+            continue
+        report["classes"][class_name] = class_map(
+            samples, predictions, name_to_id[class_name]
+        )
+    return report
+
+
+def pick_variant(reports: List[Dict], min_map: float, metric: str) -> Optional[Dict]:
+    """
+    Fastest variant whose every reported class meets the accuracy floor.
+
+    Classes without ground-truth labels in the image set have no mAP and are
+    not counted.
+    """
+    eligible = []
+    for report in reports:
+        scored = [
+            scores[metric]
+            for scores in report["classes"].values()
+            if scores["instances"] > 0
+        ]
+        if scored and all(value >= min_map for value in scored):
+            eligible.append(report)
+    return min(eligible, key=lambda r: r["latency_ms_mean"], default=None)
+
+
+def _fmt(value: Optional[float]) -> str:
+    return "   -  " if value is None else f"{value:.4f}"
+
+
+def print_report(reports: List[Dict], class_names: List[str]) -> None:
+    """Print the side-by-side comparison table."""
+    header = f"{'variant':15s} {'mean ms':>8s} {'p95 ms':>8s} {'img/s':>7s}"
+    for class_name in class_names:
+        header += f" {class_name + ' mAP50':>18s} {class_name + ' mAP50-95':>21s}"
+    print("=" * len(header))
+    print(header)
+    print("=" * len(header))
+
+    for report in reports:
+        row = (
+            f"{report['variant']:15s} {report['latency_ms_mean']:8.1f} "
+            f"{report['latency_ms_p95']:8.1f} {report['throughput_fps']:7.1f}"
+        )
+        for class_name in class_names:
+            scores = report["classes"].get(class_name, {})
+            row += (
+                f" {_fmt(scores.get('map50')):>18s}"
+                f" {_fmt(scores.get('map50_95')):>21s}"
+            )
+        print(row)
+    print("=" * len(header))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--images", required=True, help="Directory of test images")
+    parser.add_argument(
+        "--labels",
+        help="Directory of YOLO .txt labels (default: sibling 'labels' directory)",
+    )
+    parser.add_argument(
+        "--variants",
+        default=",".join(MODEL_VARIANTS),
+        help=f"Comma-separated variants to compare (default: all of {MODEL_VARIANTS})",
+    )
+    parser.add_argument(
+        "--classes",
+        default="pothole,speed_bump",
+        help="Comma-separated class names to report",
+    )
+    parser.add_argument(
+        "--min-map",
+        type=float,
+        default=0.0,
+        help="Accuracy floor every reported class must meet",
+    )
+    parser.add_argument(
+        "--metric",
+        choices=["map50", "map50_95"],
+        default="map50",
+        help="Metric the accuracy floor applies to",
+    )
+    parser.add_argument("--warmup", type=int, default=5, help="Warm-up images")
+    parser.add_argument("--json", help="Optional path to write the report as JSON")
+    args = parser.parse_args()
+
+    images_dir = Path(args.images)
+    labels_dir = (
+        Path(args.labels) if args.labels else images_dir.parent / "labels"
+    )
+    variants = [v.strip() for v in args.variants.split(",") if v.strip()]
+    class_names = [c.strip() for c in args.classes.split(",") if c.strip()]
+
+    samples = load_dataset(images_dir, labels_dir)
+    if not samples:
+        print(f"✗ No images found in {images_dir}")
+        sys.exit(1)
+    print(f"✓ Loaded {len(samples)} images from {images_dir}")
+
+    reports = []
+    for variant in variants:
+        print(f"\nBenchmarking variant '{variant}'...")
+        try:
+            reports.append(
+                benchmark_variant(variant, samples, class_names, args.warmup)
+            )
+        except Exception as e:
+            print(f"✗ Variant '{variant}' failed: {e}")
+
+    print()
+    print_report(reports, class_names)
+
+    best = pick_variant(reports, args.min_map, args.metric)
+    if best:
+        print(
+            f"\n✓ Fastest variant with {args.metric} >= {args.min_map}: "
+            f"{best['variant']} ({best['latency_ms_mean']:.1f} ms/image)"
+        )
+        print(f"  Set MODEL_VARIANT={best['variant']} in .env to use it.")
+    else:
+        print(f"\n✗ No variant meets {args.metric} >= {args.min_map}")
+
+    if args.json:
+        Path(args.json).write_text(
+            json.dumps(
+                {
+                    "images": len(samples),
+                    "min_map": args.min_map,
+                    "metric": args.metric,
+                    "recommended": best["variant"] if best else None,
+                    "variants": reports,
+                },
+                indent=2,
+            )
+        )
+        print(f"✓ Report written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -18,11 +18,39 @@ MODEL_PATH = BASE_DIR / os.getenv("MODEL_PATH", "models/best.pt")
 CONFIDENCE_THRESHOLD = float(os.getenv("CONFIDENCE_THRESHOLD", 0.25))
 IOU_THRESHOLD = float(os.getenv("IOU_THRESHOLD", 0.45))
 
+# Model variant: fp32 (original best.pt), onnx, onnx_int8, openvino, openvino_fp16
+# Non-fp32 variants are exported from MODEL_PATH on first use.
+MODEL_VARIANT = os.getenv("MODEL_VARIANT", "fp32")
+# Inference size; unset = the size the checkpoint was trained at
+MODEL_IMGSZ = int(os.getenv("MODEL_IMGSZ")) if os.getenv("MODEL_IMGSZ") else None
+# Optional image directory for calibrating static INT8 quantization
+QUANT_CALIBRATION_DIR = os.getenv("QUANT_CALIBRATION_DIR", "")
+
+# Uploads keep the raw candidates of one low-threshold inference pass so they
+# can be re-scored at any confidence/IoU threshold at or above the floor
+RAW_CONFIDENCE_FLOOR = float(os.getenv("RAW_CONFIDENCE_FLOOR", 0.05))
+RAW_MAX_CANDIDATES = int(os.getenv("RAW_MAX_CANDIDATES", 1000))
+
 # File Upload Configuration
 MAX_UPLOAD_SIZE = int(os.getenv("MAX_UPLOAD_SIZE", 100000000))  # 100MB
 UPLOAD_DIR = BASE_DIR / os.getenv("UPLOAD_DIR", "uploads")
 OUTPUT_DIR = BASE_DIR / os.getenv("OUTPUT_DIR", "outputs")
 
+# Video Decoding Configuration
+VIDEO_FRAME_STRIDE = int(os.getenv("VIDEO_FRAME_STRIDE", 1))  # process every Nth frame
+VIDEO_DECODE_MAX_WIDTH = int(os.getenv("VIDEO_DECODE_MAX_WIDTH", 0))  # 0 = source size
+VIDEO_DECODE_THREADS = int(os.getenv("VIDEO_DECODE_THREADS", 0))  # 0 = one per core
+
+# Scheduler Configuration (fair sharing of the detector between clients)
+SCHEDULER_CLIENT_MAX_FPS = float(os.getenv("SCHEDULER_CLIENT_MAX_FPS", 10))  # 0 = unlimited
+SCHEDULER_CLIENT_BURST = float(os.getenv("SCHEDULER_CLIENT_BURST", 5))
+# Total live FPS per remote host, across all of its client ids (0 = unlimited)
+SCHEDULER_HOST_MAX_FPS = float(os.getenv("SCHEDULER_HOST_MAX_FPS", 30))
+SCHEDULER_LIVE_QUEUE_DEPTH = int(os.getenv("SCHEDULER_LIVE_QUEUE_DEPTH", 2))
+SCHEDULER_LIVE_DEADLINE_MS = float(os.getenv("SCHEDULER_LIVE_DEADLINE_MS", 500))
+# Fair-share weights per remote host address, e.g. "10.0.0.5:2,10.0.0.6:1"
+SCHEDULER_HOST_WEIGHTS = os.getenv("SCHEDULER_HOST_WEIGHTS", "")
+
 # CORS Configuration
 ALLOWED_ORIGINS = os.getenv(
     "ALLOWED_ORIGINS",
@@ -1,16 +1,28 @@
+import math
 import shutil
 import uuid
 from datetime import datetime
 from pathlib import Path
+from typing import Optional, Tuple
 
 import config
 import cv2
 import numpy as np
 import uvicorn
-from fastapi import FastAPI, File, HTTPException, UploadFile
+from fastapi import FastAPI, File, HTTPException, Query, Request, UploadFile
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import FileResponse, JSONResponse
 from utils.detector import RoadHazardDetector
+from utils.result_cache import ResultCache
+from utils.scheduler import (
+    BATCH,
+    LIVE,
+    InferenceScheduler,
+    JobDropped,
+    RateLimitExceeded,
+    parse_host_weights,
+)
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -26,16 +38,53 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Total-Detections", "X-Result-Id"],
 )
 
 # Initialize detector (will be loaded on startup)
 detector = None
 
+# All inference goes through the scheduler so clients share the detector fairly
+scheduler = InferenceScheduler(
+    max_fps=config.SCHEDULER_CLIENT_MAX_FPS,
+    burst=config.SCHEDULER_CLIENT_BURST,
+    host_max_fps=config.SCHEDULER_HOST_MAX_FPS,
+    live_queue_depth=config.SCHEDULER_LIVE_QUEUE_DEPTH,
+    live_deadline_ms=config.SCHEDULER_LIVE_DEADLINE_MS,
+    weights=parse_host_weights(config.SCHEDULER_HOST_WEIGHTS),
+)
+
+# Raw candidates of processed uploads, for re-scoring at new thresholds.
+# Stored in OUTPUT_DIR, so /api/cleanup removes them with the other outputs.
+result_cache = ResultCache(config.OUTPUT_DIR)
+
+
+def get_client(request: Request) -> Tuple[str, str]:
+    """
+    Client session identity as (client_id, host).
+
+    client_id is the X-Client-ID header (else the remote address). The
+    scheduler keys sessions and rate limits on both, so the header alone
+    can't be used to impersonate or escape another client's limits.
+    """
+    host = request.client.host if request.client else ""
+    return request.headers.get("X-Client-ID") or host, host
+
+
+def validate_confidence(conf: Optional[float]):
+    """Reject confidence thresholds below the floor candidates are kept at"""
+    if conf is not None and conf < config.RAW_CONFIDENCE_FLOOR:
+        raise HTTPException(
+            status_code=400,
+            detail=f"conf must be at least {config.RAW_CONFIDENCE_FLOOR}",
+        )
+
 
 @app.on_event("startup")
 async def startup_event():
     """Initialize the YOLO model on startup"""
     global detector
+    scheduler.start()
     try:
         detector = RoadHazardDetector()
         print("✓ Server started successfully!")
@@ -49,6 +98,12 @@ async def startup_event():
         )
 
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop the inference scheduler"""
+    scheduler.stop()
+
+
 @app.get("/")
 async def root():
     """Health check endpoint"""
@@ -68,18 +123,28 @@ async def health_check():
         "status": "healthy",
         "model_loaded": detector is not None,
         "model_path": str(config.MODEL_PATH),
+        "model_variant": detector.variant if detector else config.MODEL_VARIANT,
         "confidence_threshold": config.CONFIDENCE_THRESHOLD,
         "iou_threshold": config.IOU_THRESHOLD,
+        "raw_confidence_floor": config.RAW_CONFIDENCE_FLOOR,
+        "scheduler": scheduler.stats(),
     }
 
 
 @app.post("/api/detect/image")
-async def detect_image(image: UploadFile = File(...)):
+async def detect_image(
+    request: Request,
+    image: UploadFile = File(...),
+    conf: Optional[float] = Query(None, ge=0, le=1),
+    iou: Optional[float] = Query(None, ge=0, le=1),
+):
     """
     Detect road hazards in an uploaded image.
 
     Args:
         image: Uploaded image file (JPG, PNG, etc.)
+        conf: Confidence threshold (defaults to CONFIDENCE_THRESHOLD)
+        iou: NMS IoU threshold (defaults to IOU_THRESHOLD)
 
     Returns:
         JSON with detections array containing class, confidence, and bounding boxes
@@ -88,6 +153,7 @@ async def detect_image(image: UploadFile = File(...)):
         raise HTTPException(
             status_code=503, detail="Model not loaded. Please check server logs."
         )
+    validate_confidence(conf)
 
     # Validate file extension
     file_ext = Path(image.filename).suffix.lower()
@@ -105,8 +171,19 @@ async def detect_image(image: UploadFile = File(...)):
         with input_path.open("wb") as buffer:
             shutil.copyfileobj(image.file, buffer)
 
-        # Run detection
-        annotated_image, detections = detector.detect_image(str(input_path))
+        image_data = cv2.imread(str(input_path))
+        if image_data is None:
+            raise ValueError("Failed to read uploaded image")
+
+        # Run inference once, then filter the candidates at the thresholds
+        client_id, host = get_client(request)
+        candidates = await scheduler.run(
+            client_id, BATCH, detector.predict_candidates, image_data, host=host
+        )
+        result_cache.put(file_id, "image", [(0, candidates)])
+
+        detections = detector.filter_candidates(candidates, conf, iou)
+        annotated_image = detector.draw_detections(image_data, detections)
 
         # Save annotated image (optional, for debugging)
         output_path = config.OUTPUT_DIR / f"{file_id}_detected{file_ext}"
@@ -118,6 +195,7 @@ async def detect_image(image: UploadFile = File(...)):
                 "detections": detections,
                 "total_detections": len(detections),
                 "image_id": file_id,
+                "result_id": file_id,
             }
         )
 
@@ -131,20 +209,34 @@ async def detect_image(image: UploadFile = File(...)):
 
 
 @app.post("/api/detect/video")
-async def detect_video(video: UploadFile = File(...)):
+async def detect_video(
+    request: Request,
+    video: UploadFile = File(...),
+    frame_stride: Optional[int] = Query(None, ge=1),
+    max_width: Optional[int] = Query(None, ge=0),
+    conf: Optional[float] = Query(None, ge=0, le=1),
+    iou: Optional[float] = Query(None, ge=0, le=1),
+):
     """
     Detect road hazards in an uploaded video.
 
     Args:
         video: Uploaded video file (MP4, AVI, MOV, etc.)
+        frame_stride: Process every Nth frame (defaults to VIDEO_FRAME_STRIDE)
+        max_width: Downscale wider frames while decoding (defaults to
+            VIDEO_DECODE_MAX_WIDTH, 0 = source resolution)
+        conf: Confidence threshold (defaults to CONFIDENCE_THRESHOLD)
+        iou: NMS IoU threshold (defaults to IOU_THRESHOLD)
 
     Returns:
-        Annotated video file with detections drawn
+        Annotated video file with detections drawn. The X-Result-Id header
+        can be used to re-score the video at other thresholds.
     """
     if not detector:
         raise HTTPException(
             status_code=503, detail="Model not loaded. Please check server logs."
         )
+    validate_confidence(conf)
 
     # Validate file extension
     file_ext = Path(video.filename).suffix.lower()
@@ -154,6 +246,8 @@ async def detect_video(video: UploadFile = File(...)):
             detail=f"Unsupported video format. Supported: {config.SUPPORTED_VIDEO_FORMATS}",
         )
 
+    client_id, host = get_client(request)
+
     # Save uploaded file
     file_id = str(uuid.uuid4())
     input_path = config.UPLOAD_DIR / f"{file_id}{file_ext}"
@@ -164,15 +258,34 @@ async def detect_video(video: UploadFile = File(...)):
         with input_path.open("wb") as buffer:
             shutil.copyfileobj(video.file, buffer)
 
-        # Run detection on video
-        detections = detector.detect_video(str(input_path), str(output_path))
+        # Run detection on video, scheduling each frame as batch work
+        frames = []
+        detections = await run_in_threadpool(
+            detector.detect_video,
+            str(input_path),
+            str(output_path),
+            frame_stride=frame_stride,
+            max_width=max_width,
+            run_inference=lambda fn, frame: scheduler.run_sync(
+                client_id, BATCH, fn, frame, host=host
+            ),
+            conf=conf,
+            iou=iou,
+            candidates_callback=lambda index, candidates: frames.append(
+                (index, candidates)
+            ),
+        )
+        result_cache.put(file_id, "video", frames)
 
         # Return the processed video
         return FileResponse(
             path=str(output_path),
             media_type="video/mp4",
             filename=f"detected_{video.filename}",
-            headers={"X-Total-Detections": str(len(detections))},
+            headers={
+                "X-Total-Detections": str(len(detections)),
+                "X-Result-Id": file_id,
+            },
         )
 
     except Exception as e:
@@ -187,12 +300,19 @@ async def detect_video(video: UploadFile = File(...)):
 
 
 @app.post("/api/detect/frame")
-async def detect_frame(frame: UploadFile = File(...)):
+async def detect_frame(
+    request: Request,
+    frame: UploadFile = File(...),
+    conf: Optional[float] = Query(None, ge=0, le=1),
+    iou: Optional[float] = Query(None, ge=0, le=1),
+):
     """
     Detect road hazards in a single frame (for live detection).
 
     Args:
         frame: Uploaded frame image
+        conf: Confidence threshold (defaults to CONFIDENCE_THRESHOLD)
+        iou: NMS IoU threshold (defaults to IOU_THRESHOLD)
 
     Returns:
         JSON with detections for that frame
@@ -215,7 +335,10 @@ async def detect_frame(frame: UploadFile = File(...)):
         print(f"📸 Frame received: shape={frame_img.shape}, size={len(contents)} bytes")
 
         # Run detection
-        _, detections = detector.detect_frame(frame_img)
+        client_id, host = get_client(request)
+        _, detections = await scheduler.run(
+            client_id, LIVE, detector.detect_frame, frame_img, conf, iou, host=host
+        )
 
         # Log detection results
         print(f"🔍 Detections found: {len(detections)}")
@@ -223,7 +346,7 @@ async def detect_frame(frame: UploadFile = File(...)):
             for det in detections:
                 print(f"  - {det['class']}: {det['confidence']:.2%} at {det['bbox']}")
         else:
-            print(f"  ⚠️ No detections above confidence threshold ({config.CONFIDENCE_THRESHOLD})")
+            print(f"  ⚠️ No detections above confidence threshold ({conf or detector.conf_threshold})")
 
         return JSONResponse(
             content={
@@ -233,10 +356,78 @@ async def detect_frame(frame: UploadFile = File(...)):
             }
         )
 
+    except HTTPException:
+        raise
+
+    except RateLimitExceeded as e:
+        raise HTTPException(
+            status_code=429,
+            detail=str(e),
+            headers={"Retry-After": str(math.ceil(e.retry_after))},
+        )
+
+    except JobDropped as e:
+        raise HTTPException(status_code=503, detail=f"Frame dropped: {str(e)}")
+
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Frame detection failed: {str(e)}")
 
 
+@app.get("/api/results/{result_id}")
+async def rescore_result(
+    result_id: str,
+    conf: Optional[float] = Query(None, ge=0, le=1),
+    iou: Optional[float] = Query(None, ge=0, le=1),
+):
+    """
+    Re-score a processed image or video at new thresholds.
+
+    Filters the raw candidates stored when the upload was processed, so no
+    inference is run.
+
+    Args:
+        result_id: image_id / result_id (images) or X-Result-Id (videos)
+        conf: Confidence threshold (defaults to CONFIDENCE_THRESHOLD)
+        iou: NMS IoU threshold (defaults to IOU_THRESHOLD)
+
+    Returns:
+        JSON with detections at the requested thresholds
+    """
+    if not detector:
+        raise HTTPException(
+            status_code=503, detail="Model not loaded. Please check server logs."
+        )
+    validate_confidence(conf)
+
+    entry = await run_in_threadpool(result_cache.get, result_id)
+    if entry is None:
+        raise HTTPException(
+            status_code=404,
+            detail="Result not found. It may have expired; please re-upload.",
+        )
+
+    def rescore():
+        detections = []
+        for frame_index, candidates in entry["frames"]:
+            for detection in detector.filter_candidates(candidates, conf, iou):
+                if entry["type"] == "video":
+                    detection["frame"] = frame_index
+                detections.append(detection)
+        return detections
+
+    detections = await run_in_threadpool(rescore)
+
+    return JSONResponse(
+        content={
+            "success": True,
+            "result_id": result_id,
+            "type": entry["type"],
+            "detections": detections,
+            "total_detections": len(detections),
+        }
+    )
+
+
 @app.delete("/api/cleanup")
 async def cleanup_files():
     """
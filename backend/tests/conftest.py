@@ -0,0 +1,14 @@
+from types import SimpleNamespace
+
+import pytest
+from utils.detector import RoadHazardDetector
+
+
+@pytest.fixture
+def detector():
+    """Detector without a model, for the post-processing code paths."""
+    detector = RoadHazardDetector.__new__(RoadHazardDetector)
+    detector.model = SimpleNamespace(names={0: "pothole", 1: "speed_bump"})
+    detector.conf_threshold = 0.25
+    detector.iou_threshold = 0.45
+    return detector
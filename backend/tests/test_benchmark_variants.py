@@ -0,0 +1,88 @@
+import numpy as np
+import pytest
+from benchmark_variants import class_map, pick_variant
+
+
+def make_sample(boxes, classes):
+    return {
+        "gt_boxes": np.array(boxes, dtype=np.float32).reshape(-1, 4),
+        "gt_classes": np.array(classes, dtype=np.int64),
+    }
+
+
+def make_prediction(boxes, confs, classes):
+    return {
+        "boxes": np.array(boxes, dtype=np.float32).reshape(-1, 4),
+        "confs": np.array(confs, dtype=np.float32),
+        "classes": np.array(classes, dtype=np.int64),
+    }
+
+
+def test_class_map_perfect_predictions():
+    samples = [
+        make_sample([[10, 10, 50, 50], [60, 60, 90, 90]], [0, 1]),
+        make_sample([[0, 0, 20, 20]], [0]),
+    ]
+    predictions = [
+        make_prediction([[10, 10, 50, 50], [60, 60, 90, 90]], [0.9, 0.8], [0, 1]),
+        make_prediction([[0, 0, 20, 20]], [0.7], [0]),
+    ]
+
+    scores = class_map(samples, predictions, 0)
+
+    assert scores["instances"] == 2
+    # Trapezoidal integration ends on the precision-0 sentinel, so the
+    # maximum is 0.995 rather than 1.0 (same as the ultralytics metric)
+    assert scores["map50"] == pytest.approx(1.0, abs=0.01)
+    assert scores["map50_95"] == pytest.approx(1.0, abs=0.01)
+
+
+def test_class_map_penalises_false_positives_and_misses():
+    samples = [make_sample([[10, 10, 50, 50], [60, 60, 90, 90]], [0, 0])]
+    # One exact match, one confident box on background, second object missed
+    predictions = [
+        make_prediction([[100, 100, 120, 120], [10, 10, 50, 50]], [0.9, 0.8], [0, 0])
+    ]
+
+    scores = class_map(samples, predictions, 0)
+
+    assert 0.0 < scores["map50"] < 0.5
+    assert scores["map50_95"] <= scores["map50"]
+
+
+def test_class_map_without_ground_truth():
+    samples = [make_sample([[10, 10, 50, 50]], [0])]
+    predictions = [make_prediction([[10, 10, 50, 50]], [0.9], [0])]
+
+    assert class_map(samples, predictions, 1) == {
+        "map50": None,
+        "map50_95": None,
+        "instances": 0,
+    }
+
+
+def test_pick_variant_fastest_above_floor():
+    def report(variant, latency, pothole, speed_bump_instances=3):
+        return {
+            "variant": variant,
+            "latency_ms_mean": latency,
+            "classes": {
+                "pothole": {"map50": pothole, "instances": 5},
+                "speed_bump": {
+                    "map50": 0.9 if speed_bump_instances else None,
+                    "instances": speed_bump_instances,
+                },
+            },
+        }
+
+    reports = [
+        report("fp32", 50.0, 0.8),
+        report("onnx", 30.0, 0.79),
+        report("onnx_int8", 10.0, 0.5),
+    ]
+    assert pick_variant(reports, 0.75, "map50")["variant"] == "onnx"
+    assert pick_variant(reports, 0.95, "map50") is None
+
+    # Classes without labels are ignored rather than failing the floor
+    reports = [report("openvino", 20.0, 0.8, speed_bump_instances=0)]
+    assert pick_variant(reports, 0.75, "map50")["variant"] == "openvino"
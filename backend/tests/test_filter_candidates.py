@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+import torch
+import torchvision
+
+CLASS_NAMES = {0: "pothole", 1: "speed_bump"}
+
+
+def make_candidates(count=300, seed=0):
+    """Overlapping boxes with distinct scores, as stored at the raw floor."""
+    rng = np.random.default_rng(seed)
+    centers = rng.uniform(50, 250, (count, 2))
+    sizes = rng.uniform(20, 80, (count, 2))
+    return {
+        "boxes": np.hstack([centers - sizes / 2, centers + sizes / 2]).astype(
+            np.float32
+        ),
+        "scores": rng.permutation(np.linspace(0.06, 0.99, count)).astype(np.float32),
+        "classes": rng.integers(0, 2, count).astype(np.int64),
+    }
+
+
+def direct_pass(candidates, conf, iou):
+    """What a model pass at conf/iou keeps: threshold, then per-class NMS."""
+    keep = candidates["scores"] > conf
+    boxes = torch.from_numpy(candidates["boxes"][keep])
+    scores = torch.from_numpy(candidates["scores"][keep])
+    classes = torch.from_numpy(candidates["classes"][keep])
+    kept = torchvision.ops.batched_nms(boxes, scores, classes, iou).numpy()
+    return sorted(
+        (CLASS_NAMES[int(classes[i])], round(float(scores[i]), 5)) for i in kept
+    )
+
+
+@pytest.mark.parametrize("conf,iou", [(0.05, 0.45), (0.25, 0.45), (0.5, 0.3), (0.7, 0.7)])
+def test_filter_matches_direct_pass(detector, conf, iou):
+    candidates = make_candidates()
+
+    detections = detector.filter_candidates(candidates, conf, iou)
+
+    assert sorted(
+        (d["class"], round(d["confidence"], 5)) for d in detections
+    ) == direct_pass(candidates, conf, iou)
+
+
+def test_filter_output_format(detector):
+    candidates = {
+        "boxes": np.array([[10, 20, 50, 80], [12, 22, 50, 80]], dtype=np.float32),
+        "scores": np.array([0.6, 0.9], dtype=np.float32),
+        "classes": np.array([1, 1], dtype=np.int64),
+    }
+
+    detections = detector.filter_candidates(candidates)
+
+    # The two boxes overlap, so NMS keeps only the higher-scoring one, as xywh
+    assert detections == [
+        {
+            "class": "speed_bump",
+            "confidence": pytest.approx(0.9),
+            "bbox": [12.0, 22.0, 38.0, 58.0],
+        }
+    ]
+
+
+def test_filter_empty_candidates(detector):
+    candidates = {
+        "boxes": np.zeros((0, 4), dtype=np.float32),
+        "scores": np.zeros(0, dtype=np.float32),
+        "classes": np.zeros(0, dtype=np.int64),
+    }
+    assert detector.filter_candidates(candidates, 0.1, 0.5) == []
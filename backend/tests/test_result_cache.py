@@ -0,0 +1,71 @@
+import uuid
+
+import numpy as np
+import pytest
+from utils.result_cache import ResultCache
+
+
+def make_candidates(count, seed=0):
+    rng = np.random.default_rng(seed)
+    top_left = rng.uniform(0, 500, (count, 2))
+    return {
+        "boxes": np.hstack([top_left, top_left + 50]).astype(np.float32),
+        "scores": rng.uniform(0.05, 1, count).astype(np.float32),
+        "classes": rng.integers(0, 2, count).astype(np.int64),
+    }
+
+
+def assert_candidates_equal(actual, expected):
+    for name in ("boxes", "scores", "classes"):
+        np.testing.assert_array_equal(actual[name], expected[name])
+        assert actual[name].dtype == expected[name].dtype
+
+
+def test_video_round_trip_keeps_empty_frames(tmp_path):
+    cache = ResultCache(tmp_path)
+    result_id = str(uuid.uuid4())
+    frames = [
+        (0, make_candidates(3, seed=1)),
+        (3, make_candidates(0)),
+        (6, make_candidates(5, seed=2)),
+        (9, make_candidates(0)),
+    ]
+
+    cache.put(result_id, "video", frames)
+    entry = cache.get(result_id)
+
+    assert entry["type"] == "video"
+    assert [index for index, _ in entry["frames"]] == [0, 3, 6, 9]
+    for (_, actual), (_, expected) in zip(entry["frames"], frames):
+        assert_candidates_equal(actual, expected)
+
+
+def test_image_round_trip(tmp_path):
+    cache = ResultCache(tmp_path)
+    result_id = str(uuid.uuid4())
+    candidates = make_candidates(4)
+
+    cache.put(result_id, "image", [(0, candidates)])
+    entry = cache.get(result_id)
+
+    assert entry["type"] == "image"
+    assert len(entry["frames"]) == 1
+    assert_candidates_equal(entry["frames"][0][1], candidates)
+    # Stored in the output directory so the regular cleanup removes it
+    assert [path.name for path in tmp_path.iterdir()] == [
+        f"{result_id}_candidates.npz"
+    ]
+
+
+def test_missing_result(tmp_path):
+    assert ResultCache(tmp_path).get(str(uuid.uuid4())) is None
+
+
+@pytest.mark.parametrize("result_id", ["../../etc/passwd", "not-a-uuid", ""])
+def test_invalid_result_ids_rejected(tmp_path, result_id):
+    cache = ResultCache(tmp_path)
+
+    assert cache.get(result_id) is None
+    with pytest.raises(ValueError):
+        cache.put(result_id, "image", [(0, make_candidates(1))])
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,180 @@
+import threading
+import time
+
+import pytest
+from utils.scheduler import (
+    BATCH,
+    LIVE,
+    InferenceScheduler,
+    JobDropped,
+    RateLimitExceeded,
+    parse_host_weights,
+)
+
+
+@pytest.fixture
+def make_scheduler():
+    schedulers = []
+
+    def factory(**kwargs):
+        scheduler = InferenceScheduler(**kwargs)
+        scheduler.start()
+        schedulers.append(scheduler)
+        return scheduler
+
+    yield factory
+    for scheduler in schedulers:
+        scheduler.stop()
+
+
+def block_worker(scheduler):
+    """Occupy the worker until the returned event is set."""
+    started, release = threading.Event(), threading.Event()
+
+    def blocker():
+        started.set()
+        release.wait(5)
+
+    future = scheduler.submit("blocker", BATCH, blocker)
+    assert started.wait(5)
+    return release, future
+
+
+def test_weighted_fair_queuing_order(make_scheduler):
+    scheduler = make_scheduler(weights={"10.0.0.1": 2})
+    release, _ = block_worker(scheduler)
+
+    order = []
+    futures = []
+    for _ in range(6):
+        futures.append(
+            scheduler.submit("a", BATCH, order.append, "a", host="10.0.0.1")
+        )
+        futures.append(
+            scheduler.submit("b", BATCH, order.append, "b", host="10.0.0.2")
+        )
+    release.set()
+    for future in futures:
+        future.result(5)
+
+    # Host of "a" has twice the weight, so it gets two slots for every one of "b"
+    assert order[:9].count("a") == 6
+    assert order[:9].count("b") == 3
+
+
+def test_batch_jobs_shared_per_host(make_scheduler):
+    scheduler = make_scheduler()
+    release, _ = block_worker(scheduler)
+
+    order = []
+    futures = []
+    # One host spreads its jobs over many client ids, another uses one id
+    for i in range(4):
+        futures.append(
+            scheduler.submit(f"id-{i}", BATCH, order.append, "many", host="10.0.0.1")
+        )
+    for _ in range(4):
+        futures.append(
+            scheduler.submit("single", BATCH, order.append, "one", host="10.0.0.2")
+        )
+    release.set()
+    for future in futures:
+        future.result(5)
+
+    # Both hosts alternate, whatever number of client ids they use
+    assert order[:4].count("many") == 2
+    assert order[:4].count("one") == 2
+
+
+def test_live_jobs_preempt_batch_jobs(make_scheduler):
+    scheduler = make_scheduler()
+    release, _ = block_worker(scheduler)
+
+    order = []
+    futures = [scheduler.submit("video", BATCH, order.append, "batch") for _ in range(3)]
+    futures.append(scheduler.submit("camera", LIVE, order.append, "live"))
+    release.set()
+    for future in futures:
+        future.result(5)
+
+    assert order == ["live", "batch", "batch", "batch"]
+
+
+def test_session_fps_cap_rejects_excess_frames(make_scheduler):
+    scheduler = make_scheduler(max_fps=2, burst=1)
+
+    scheduler.submit("camera", LIVE, lambda: None).result(5)
+    with pytest.raises(RateLimitExceeded) as excinfo:
+        scheduler.submit("camera", LIVE, lambda: None)
+    assert 0 < excinfo.value.retry_after <= 0.5
+
+    # Batch work is not rate limited
+    scheduler.submit("camera", BATCH, lambda: None).result(5)
+    assert scheduler.stats()["rate_limited"] == 1
+
+
+def test_host_fps_cap_spans_client_ids(make_scheduler):
+    scheduler = make_scheduler(max_fps=10, burst=10, host_max_fps=1)
+
+    scheduler.submit("id-1", LIVE, lambda: None, host="10.0.0.1").result(5)
+    with pytest.raises(RateLimitExceeded):
+        scheduler.submit("id-2", LIVE, lambda: None, host="10.0.0.1")
+
+    # The same client id from another host is a separate session
+    scheduler.submit("id-1", LIVE, lambda: None, host="10.0.0.2").result(5)
+
+
+def test_newer_live_frame_supersedes_queued_one(make_scheduler):
+    scheduler = make_scheduler(live_queue_depth=1)
+    release, _ = block_worker(scheduler)
+
+    first = scheduler.submit("camera", LIVE, lambda: "first")
+    second = scheduler.submit("camera", LIVE, lambda: "second")
+    release.set()
+
+    with pytest.raises(JobDropped):
+        first.result(5)
+    assert second.result(5) == "second"
+
+
+def test_live_frame_dropped_past_deadline(make_scheduler):
+    scheduler = make_scheduler(live_deadline_ms=20)
+    release, _ = block_worker(scheduler)
+
+    late = scheduler.submit("camera", LIVE, lambda: "late")
+    time.sleep(0.05)
+    release.set()
+
+    with pytest.raises(JobDropped):
+        late.result(5)
+    assert scheduler.stats()["dropped"] == 1
+
+
+def test_cancelled_job_does_not_kill_worker(make_scheduler):
+    scheduler = make_scheduler(live_deadline_ms=20)
+    release, _ = block_worker(scheduler)
+
+    cancelled = scheduler.submit("camera", LIVE, lambda: "cancelled")
+    assert cancelled.cancel()
+    time.sleep(0.05)
+    release.set()
+
+    # The deadline drop of the cancelled job must not crash the worker
+    assert scheduler.submit("camera", BATCH, lambda: "ok").result(5) == "ok"
+
+
+def test_stats_do_not_expose_client_ids(make_scheduler):
+    scheduler = make_scheduler()
+    scheduler.submit("secret-camera-id", BATCH, lambda: None).result(5)
+
+    stats = scheduler.stats()
+    assert "secret-camera-id" not in repr(stats)
+    assert stats["clients"] == 1
+    assert stats["completed"] == 1
+
+
+def test_parse_host_weights():
+    assert parse_host_weights("10.0.0.1:2, ::1:0.5,bad,10.0.0.3:0") == {
+        "10.0.0.1": 2.0,
+        "::1": 0.5,
+    }
@@ -0,0 +1,87 @@
+import cv2
+import numpy as np
+import pytest
+from utils.video_decoder import VideoDecoder
+
+WIDTH, HEIGHT, FRAMES = 640, 360, 25
+
+
+@pytest.fixture
+def video_path(tmp_path):
+    """Synthetic video whose frame brightness encodes the frame index."""
+    path = tmp_path / "input.mp4"
+    writer = cv2.VideoWriter(
+        str(path), cv2.VideoWriter_fourcc(*"mp4v"), 25, (WIDTH, HEIGHT)
+    )
+    for index in range(FRAMES):
+        writer.write(np.full((HEIGHT, WIDTH, 3), index * 10, dtype=np.uint8))
+    writer.release()
+    return str(path)
+
+
+def test_frame_stride_keeps_source_indices(video_path):
+    with VideoDecoder(video_path, frame_stride=3) as decoder:
+        frames = list(decoder)
+
+    assert [index for index, _ in frames] == list(range(0, FRAMES, 3))
+    for index, frame in frames:
+        # Each yielded frame is the source frame with that index
+        assert abs(frame.mean() - index * 10) < 5
+
+
+def test_max_width_scales_each_axis(video_path):
+    with VideoDecoder(video_path, max_width=321) as decoder:
+        frames = list(decoder)
+
+        assert decoder.output_size == (321, 181)
+        assert decoder.scale_x == pytest.approx(321 / WIDTH)
+        assert decoder.scale_y == pytest.approx(181 / HEIGHT)
+
+    assert len(frames) == FRAMES
+    assert all(frame.shape == (181, 321, 3) for _, frame in frames)
+
+
+def test_narrow_video_keeps_source_size(video_path):
+    with VideoDecoder(video_path, max_width=1280) as decoder:
+        assert decoder.output_size == (WIDTH, HEIGHT)
+        assert decoder.scale_x == decoder.scale_y == 1.0
+
+
+def test_invalid_stride(video_path):
+    with pytest.raises(ValueError):
+        VideoDecoder(video_path, frame_stride=0)
+
+
+def test_detect_video_maps_boxes_to_source(detector, video_path):
+    source_box = np.array([64, 36, 320, 180], dtype=np.float32)
+    decoded_sizes, stored = [], []
+
+    def fake_inference(fn, frame):
+        # The model sees the decoded frame, so it reports decoded coordinates
+        height, width = frame.shape[:2]
+        decoded_sizes.append((width, height))
+        scale = np.array([width / WIDTH, height / HEIGHT] * 2, dtype=np.float32)
+        return {
+            "boxes": (source_box * scale)[None],
+            "scores": np.array([0.9], dtype=np.float32),
+            "classes": np.array([0], dtype=np.int64),
+        }
+
+    detections = detector.detect_video(
+        video_path,
+        None,
+        frame_stride=5,
+        max_width=321,
+        run_inference=fake_inference,
+        candidates_callback=lambda index, candidates: stored.append(
+            (index, candidates)
+        ),
+    )
+
+    assert set(decoded_sizes) == {(321, 181)}
+    assert [d["frame"] for d in detections] == list(range(0, FRAMES, 5))
+    for detection in detections:
+        # [x, y, width, height] of the source box, in source pixels
+        assert detection["bbox"] == pytest.approx([64, 36, 256, 144], abs=1e-3)
+    for _, candidates in stored:
+        np.testing.assert_allclose(candidates["boxes"][0], source_box, atol=1e-3)
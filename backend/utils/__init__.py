@@ -1,3 +1,14 @@
 from .detector import RoadHazardDetector
+from .model_variants import MODEL_VARIANTS, ensure_variant
+from .result_cache import ResultCache
+from .scheduler import InferenceScheduler
+from .video_decoder import VideoDecoder
 
-__all__ = ["RoadHazardDetector"]
+__all__ = [
+    "RoadHazardDetector",
+    "MODEL_VARIANTS",
+    "ensure_variant",
+    "InferenceScheduler",
+    "ResultCache",
+    "VideoDecoder",
+]
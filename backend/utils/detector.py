@@ -1,11 +1,14 @@
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import Callable, Dict, List, Tuple
 
 import config
 import cv2
 import numpy as np
 from ultralytics import YOLO
 
+from .model_variants import ensure_variant, variant_imgsz
+from .video_decoder import VideoDecoder
+
 
 class RoadHazardDetector:
     """
@@ -13,14 +16,18 @@ class RoadHazardDetector:
     Detects potholes and speed bumps in images and videos.
     """
 
-    def __init__(self, model_path: str = None):
+    def __init__(self, model_path: str = None, variant: str = None):
         """
         Initialize the detector with a YOLO model.
 
         Args:
             model_path: Path to the YOLO model file (.pt)
+            variant: Model variant to run (see MODEL_VARIANTS), defaults to
+                config.MODEL_VARIANT. Reduced-precision variants are exported
+                from model_path on first use.
         """
         model_path = model_path or str(config.MODEL_PATH)
+        self.variant = variant or config.MODEL_VARIANT
 
         if not Path(model_path).exists():
             raise FileNotFoundError(
@@ -28,287 +35,428 @@ class RoadHazardDetector:
                 f"Please place your best.pt file in the models directory."
             )
 
-        print(f"Loading YOLO model from {model_path}...")
-        self.model = YOLO(model_path)
+        # Input size: None lets the checkpoint use its training size, while
+        # exported variants have a fixed input shape and must use theirs
+        self.imgsz = config.MODEL_IMGSZ
+        if self.variant != "fp32":
+            weights_path = model_path
+            model_path = str(
+                ensure_variant(
+                    weights_path,
+                    self.variant,
+                    calibration_dir=config.QUANT_CALIBRATION_DIR or None,
+                )
+            )
+            self.imgsz = variant_imgsz(weights_path, self.variant)
+
+        print(f"Loading YOLO model ({self.variant}) from {model_path}...")
+        self.model_path = model_path
+        self.model = YOLO(model_path, task="detect")
         self.conf_threshold = config.CONFIDENCE_THRESHOLD
         self.iou_threshold = config.IOU_THRESHOLD
         print("Model loaded successfully!")
 
-    def detect_image(self, image_path: str) -> Tuple[np.ndarray, List[Dict]]:
+    def predict(self, images, **kwargs):
         """
-        Detect road hazards in an image.
+        Run the YOLO model at this detector's input size.
 
         Args:
-            image_path: Path to the image file
+            images: Image or list of images as numpy arrays (BGR)
+            **kwargs: Extra arguments for YOLO.predict (conf, iou, ...)
 
         Returns:
-            Tuple of (annotated_image, detections_list)
+            List of ultralytics Results, one per image
         """
-        # Read image
-        image = cv2.imread(image_path)
-        if image is None:
-            raise ValueError(f"Failed to read image from {image_path}")
+        if self.imgsz:
+            kwargs.setdefault("imgsz", self.imgsz)
+        return self.model.predict(images, verbose=False, **kwargs)
 
-        # Run inference
-        results = self.model.predict(
-            image, conf=self.conf_threshold, iou=self.iou_threshold, verbose=False
-        )
+    def set_num_threads(self, threads: int):
+        """
+        Limit the CPU threads used for inference.
 
-        # Process results
-        detections = []
-        annotated_image = image.copy()
+        torch.set_num_threads() only covers the PyTorch checkpoint, so for
+        exported variants the ONNX Runtime session or compiled OpenVINO model
+        is rebuilt with the same limit.
 
-        if len(results) > 0 and results[0].boxes is not None:
-            boxes = results[0].boxes
+        Args:
+            threads: Maximum number of inference threads
+        """
+        import torch
+
+        torch.set_num_threads(threads)
+        if self.variant == "fp32":
+            return
+
+        # The runtime session is only created by the first predict call
+        size = self.imgsz or 640
+        self.predict(np.zeros((size, size, 3), dtype=np.uint8))
+        backend = self.model.predictor.model
+        # Newer ultralytics versions keep the runtime on a separate backend object
+        backend = getattr(backend, "backend", backend)
+
+        if getattr(backend, "session", None) is not None:
+            import onnxruntime
+
+            options = onnxruntime.SessionOptions()
+            options.intra_op_num_threads = threads
+            options.inter_op_num_threads = 1
+            backend.session = onnxruntime.InferenceSession(
+                self.model_path,
+                options,
+                providers=backend.session.get_providers(),
+            )
+        elif getattr(backend, "ov_compiled_model", None) is not None:
+            import openvino as ov
+
+            core = ov.Core()
+            xml_path = next(Path(self.model_path).glob("*.xml"))
+            backend.ov_compiled_model = core.compile_model(
+                core.read_model(xml_path),
+                "CPU",
+                {"PERFORMANCE_HINT": "LATENCY", "INFERENCE_NUM_THREADS": threads},
+            )
+
+    def predict_candidates(self, image: np.ndarray) -> Dict[str, np.ndarray]:
+        """
+        Run inference once and keep every candidate box above the floor.
 
-            for box in boxes:
-                # Get box coordinates
-                x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
-                confidence = float(box.conf[0].cpu().numpy())
-                class_id = int(box.cls[0].cpu().numpy())
-                class_name = self.model.names[class_id]
+        Candidates are taken at config.RAW_CONFIDENCE_FLOOR with NMS disabled,
+        so any confidence/IoU threshold at or above the floor can be applied
+        later with filter_candidates() without re-running the model.
 
-                # Calculate width and height
-                width = x2 - x1
-                height = y2 - y1
+        Args:
+            image: Input image as numpy array (BGR)
 
-                # Store detection
-                detections.append(
+        Returns:
+            Dict with "boxes" (N x 4 xyxy), "scores" (N) and "classes" (N)
+        """
+        return self.predict_candidates_batch([image])[0]
+
+    def predict_candidates_batch(
+        self, images: List[np.ndarray]
+    ) -> List[Dict[str, np.ndarray]]:
+        """
+        Batched version of predict_candidates() for offline processing.
+
+        Exported variants have a fixed batch size of 1, so for those the
+        images are run one at a time.
+
+        Args:
+            images: Input images as numpy arrays (BGR)
+
+        Returns:
+            List of candidate dicts, one per input image
+        """
+        kwargs = {
+            "conf": config.RAW_CONFIDENCE_FLOOR,
+            "iou": 1.0,  # IoU can never exceed 1, so NMS keeps every candidate
+            "max_det": config.RAW_MAX_CANDIDATES,
+        }
+        if self.variant == "fp32":
+            results = self.predict(images, **kwargs)
+        else:
+            results = [self.predict(image, **kwargs)[0] for image in images]
+
+        batch = []
+        for result in results:
+            if result.boxes is None:
+                batch.append(
                     {
-                        "class": class_name,
-                        "confidence": confidence,
-                        "bbox": [float(x1), float(y1), float(width), float(height)],
+                        "boxes": np.zeros((0, 4), dtype=np.float32),
+                        "scores": np.zeros(0, dtype=np.float32),
+                        "classes": np.zeros(0, dtype=np.int64),
                     }
                 )
+                continue
+
+            boxes = result.boxes
+            batch.append(
+                {
+                    "boxes": boxes.xyxy.cpu().numpy().astype(np.float32),
+                    "scores": boxes.conf.cpu().numpy().astype(np.float32),
+                    "classes": boxes.cls.cpu().numpy().astype(np.int64),
+                }
+            )
+        return batch
 
-                # Draw on image
-                color = (0, 0, 255) if class_name == "pothole" else (0, 255, 0)
-                cv2.rectangle(
-                    annotated_image, (int(x1), int(y1)), (int(x2), int(y2)), color, 2
-                )
+    def filter_candidates(
+        self, candidates: Dict[str, np.ndarray], conf: float = None, iou: float = None
+    ) -> List[Dict]:
+        """
+        Apply a confidence threshold and per-class NMS to stored candidates.
 
-                # Add label
-                label = f"{class_name} {confidence:.2f}"
-                (label_width, label_height), _ = cv2.getTextSize(
-                    label, cv2.FONT_HERSHEY_SIMPLEX, 0.5, 2
-                )
-                cv2.rectangle(
-                    annotated_image,
-                    (int(x1), int(y1) - label_height - 10),
-                    (int(x1) + label_width, int(y1)),
-                    color,
-                    -1,
-                )
-                cv2.putText(
-                    annotated_image,
-                    label,
-                    (int(x1), int(y1) - 5),
-                    cv2.FONT_HERSHEY_SIMPLEX,
-                    0.5,
-                    (255, 255, 255),
-                    2,
+        Args:
+            candidates: Output of predict_candidates()
+            conf: Confidence threshold, defaults to the configured threshold
+            iou: NMS IoU threshold, defaults to the configured threshold
+
+        Returns:
+            List of detections (class, confidence, bbox as [x, y, width, height])
+        """
+        conf = self.conf_threshold if conf is None else conf
+        iou = self.iou_threshold if iou is None else iou
+
+        boxes, scores, classes = (
+            candidates["boxes"],
+            candidates["scores"],
+            candidates["classes"],
+        )
+        keep = scores >= conf
+        boxes, scores, classes = boxes[keep], scores[keep], classes[keep]
+
+        detections = []
+        for class_id in np.unique(classes):
+            in_class = np.where(classes == class_id)[0]
+            xywh = boxes[in_class].copy()
+            xywh[:, 2:] -= xywh[:, :2]
+            kept = cv2.dnn.NMSBoxes(
+                xywh.tolist(), scores[in_class].tolist(), conf, iou
+            )
+            for i in np.array(kept, dtype=np.int64).flatten():
+                x, y, width, height = xywh[i]
+                detections.append(
+                    {
+                        "class": self.model.names[int(class_id)],
+                        "confidence": float(scores[in_class[i]]),
+                        "bbox": [float(x), float(y), float(width), float(height)],
+                    }
                 )
 
+        detections.sort(key=lambda d: d["confidence"], reverse=True)
+        return detections
+
+    def draw_detections(
+        self,
+        image: np.ndarray,
+        detections: List[Dict],
+        scale: Tuple[float, float] = (1.0, 1.0),
+    ) -> np.ndarray:
+        """
+        Draw detections on an image in place.
+
+        Args:
+            image: Image to draw on
+            detections: Detections with bbox as [x, y, width, height]
+            scale: (x, y) factors from detection to image coordinates
+
+        Returns:
+            The annotated image
+        """
+        for detection in detections:
+            scale_x, scale_y = scale
+            x, y, width, height = detection["bbox"]
+            x, width = x * scale_x, width * scale_x
+            y, height = y * scale_y, height * scale_y
+            x1, y1, x2, y2 = int(x), int(y), int(x + width), int(y + height)
+            class_name = detection["class"]
+            confidence = detection["confidence"]
+
+            color = (0, 0, 255) if class_name == "pothole" else (0, 255, 0)
+            cv2.rectangle(image, (x1, y1), (x2, y2), color, 2)
+
+            # Add label
+            label = f"{class_name} {confidence:.2f}"
+            (label_width, label_height), _ = cv2.getTextSize(
+                label, cv2.FONT_HERSHEY_SIMPLEX, 0.5, 2
+            )
+            cv2.rectangle(
+                image,
+                (x1, y1 - label_height - 10),
+                (x1 + label_width, y1),
+                color,
+                -1,
+            )
+            cv2.putText(
+                image,
+                label,
+                (x1, y1 - 5),
+                cv2.FONT_HERSHEY_SIMPLEX,
+                0.5,
+                (255, 255, 255),
+                2,
+            )
+
+        return image
+
+    def detect_image(
+        self, image_path: str, conf: float = None, iou: float = None
+    ) -> Tuple[np.ndarray, List[Dict]]:
+        """
+        Detect road hazards in an image.
+
+        Args:
+            image_path: Path to the image file
+            conf: Optional confidence threshold for this call
+            iou: Optional NMS IoU threshold for this call
+
+        Returns:
+            Tuple of (annotated_image, detections_list)
+        """
+        # Read image
+        image = cv2.imread(image_path)
+        if image is None:
+            raise ValueError(f"Failed to read image from {image_path}")
+
+        # Run inference and filter the candidates
+        candidates = self.predict_candidates(image)
+        detections = self.filter_candidates(candidates, conf, iou)
+
+        annotated_image = self.draw_detections(image.copy(), detections)
         return annotated_image, detections
 
     def detect_video(
-        self, video_path: str, output_path: str, progress_callback=None
+        self,
+        video_path: str,
+        output_path: str,
+        progress_callback=None,
+        frame_stride: int = None,
+        max_width: int = None,
+        run_inference: Callable = None,
+        conf: float = None,
+        iou: float = None,
+        candidates_callback=None,
+        decode_threads: int = None,
     ) -> List[Dict]:
         """
         Detect road hazards in a video and save annotated output.
 
         Args:
             video_path: Path to the input video file
-            output_path: Path to save the annotated video
+            output_path: Path to save the annotated video, or None to skip
+                writing it
             progress_callback: Optional callback function for progress updates
+            frame_stride: Process every Nth frame, defaults to
+                config.VIDEO_FRAME_STRIDE
+            max_width: Downscale frames wider than this while decoding,
+                defaults to config.VIDEO_DECODE_MAX_WIDTH (0 = source size)
+            run_inference: Optional wrapper called as run_inference(fn, frame)
+                for each frame, e.g. to route inference through a scheduler
+            conf: Optional confidence threshold for this call
+            iou: Optional NMS IoU threshold for this call
+            candidates_callback: Optional callback called as
+                candidates_callback(frame_index, candidates) with each frame's
+                raw candidates in source coordinates, for later re-scoring
+            decode_threads: FFmpeg decoder threads, defaults to
+                config.VIDEO_DECODE_THREADS (0 = one per CPU core)
 
         Returns:
-            List of all detections across frames
+            List of all detections across frames. Frame numbers and boxes
+            refer to the original (unsampled, full resolution) video.
         """
-        # Open video
-        cap = cv2.VideoCapture(video_path)
-        if not cap.isOpened():
-            raise ValueError(f"Failed to open video from {video_path}")
-
-        # Get video properties
-        fps = int(cap.get(cv2.CAP_PROP_FPS))
-        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-
-        # Create video writer
-        fourcc = cv2.VideoWriter_fourcc(*"mp4v")
-        out = cv2.VideoWriter(output_path, fourcc, fps, (width, height))
-
-        all_detections = []
-        frame_count = 0
-
-        print(f"Processing video: {total_frames} frames at {fps} FPS...")
-
-        while True:
-            ret, frame = cap.read()
-            if not ret:
-                break
-
-            # Run inference on frame
-            results = self.model.predict(
-                frame, conf=self.conf_threshold, iou=self.iou_threshold, verbose=False
+        if frame_stride is None:
+            frame_stride = config.VIDEO_FRAME_STRIDE
+        run_inference = run_inference or (lambda fn, frame: fn(frame))
+        if max_width is None:
+            max_width = config.VIDEO_DECODE_MAX_WIDTH
+        if decode_threads is None:
+            decode_threads = config.VIDEO_DECODE_THREADS
+
+        with VideoDecoder(
+            video_path,
+            frame_stride=frame_stride,
+            max_width=max_width,
+            threads=decode_threads,
+        ) as decoder:
+            total_frames = decoder.total_frames
+
+            # Annotated output is written at the decoded size and sampled rate
+            out = None
+            if output_path:
+                fps = decoder.fps / frame_stride
+                fourcc = cv2.VideoWriter_fourcc(*"mp4v")
+                out = cv2.VideoWriter(output_path, fourcc, fps, decoder.output_size)
+
+            all_detections = []
+            processed = 0
+
+            print(
+                f"Processing video: {total_frames} frames at {decoder.fps:.0f} FPS "
+                f"(stride {frame_stride}, decode size {decoder.output_size})..."
             )
 
-            # Process results
-            frame_detections = []
-            if len(results) > 0 and results[0].boxes is not None:
-                boxes = results[0].boxes
-
-                for box in boxes:
-                    x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
-                    confidence = float(box.conf[0].cpu().numpy())
-                    class_id = int(box.cls[0].cpu().numpy())
-                    class_name = self.model.names[class_id]
-
-                    width_box = x2 - x1
-                    height_box = y2 - y1
-
-                    frame_detections.append(
-                        {
-                            "frame": frame_count,
-                            "class": class_name,
-                            "confidence": confidence,
-                            "bbox": [
-                                float(x1),
-                                float(y1),
-                                float(width_box),
-                                float(height_box),
-                            ],
-                        }
-                    )
+            for frame_index, frame in decoder:
+                # Run inference on frame, mapping boxes to source coordinates
+                candidates = run_inference(self.predict_candidates, frame)
+                candidates["boxes"] = candidates["boxes"] / np.array(
+                    [decoder.scale_x, decoder.scale_y] * 2, dtype=np.float32
+                )
+                if candidates_callback:
+                    candidates_callback(frame_index, candidates)
 
-                    # Draw on frame
-                    color = (0, 0, 255) if class_name == "pothole" else (0, 255, 0)
-                    cv2.rectangle(
-                        frame, (int(x1), int(y1)), (int(x2), int(y2)), color, 2
-                    )
+                frame_detections = self.filter_candidates(candidates, conf, iou)
+                for detection in frame_detections:
+                    detection["frame"] = frame_index
 
-                    label = f"{class_name} {confidence:.2f}"
-                    (label_width, label_height), _ = cv2.getTextSize(
-                        label, cv2.FONT_HERSHEY_SIMPLEX, 0.5, 2
-                    )
-                    cv2.rectangle(
-                        frame,
-                        (int(x1), int(y1) - label_height - 10),
-                        (int(x1) + label_width, int(y1)),
-                        color,
-                        -1,
-                    )
-                    cv2.putText(
+                all_detections.extend(frame_detections)
+                processed += 1
+
+                # Draw on the decoded frame
+                if out:
+                    self.draw_detections(
                         frame,
-                        label,
-                        (int(x1), int(y1) - 5),
-                        cv2.FONT_HERSHEY_SIMPLEX,
-                        0.5,
-                        (255, 255, 255),
-                        2,
+                        frame_detections,
+                        scale=(decoder.scale_x, decoder.scale_y),
                     )
+                    out.write(frame)
 
-            all_detections.extend(frame_detections)
-            out.write(frame)
-            frame_count += 1
-
-            # Progress callback
-            if progress_callback and frame_count % 10 == 0:
-                progress = (frame_count / total_frames) * 100
-                progress_callback(progress)
+                # Progress callback
+                if progress_callback and total_frames and processed % 10 == 0:
+                    progress = ((frame_index + 1) / total_frames) * 100
+                    progress_callback(min(progress, 100.0))
 
-        cap.release()
-        out.release()
+            if out:
+                out.release()
 
         print(
             f"Video processing complete! Found {len(all_detections)} total detections."
         )
         return all_detections
 
-    def detect_frame(self, frame: np.ndarray) -> Tuple[np.ndarray, List[Dict]]:
+    def detect_frame(
+        self, frame: np.ndarray, conf: float = None, iou: float = None
+    ) -> Tuple[np.ndarray, List[Dict]]:
         """
         Detect road hazards in a single frame (for live detection).
 
+        Live frames are never re-scored, so the thresholds are applied by the
+        model directly instead of going through predict_candidates().
+
         Args:
             frame: Input frame as numpy array
+            conf: Optional confidence threshold for this call
+            iou: Optional NMS IoU threshold for this call
 
         Returns:
             Tuple of (annotated_frame, detections_list)
         """
         # Run inference
-        results = self.model.predict(
-            frame, conf=self.conf_threshold, iou=self.iou_threshold, verbose=False
+        results = self.predict(
+            frame,
+            conf=self.conf_threshold if conf is None else conf,
+            iou=self.iou_threshold if iou is None else iou,
         )
 
-        # Debug: Log raw model output
-        print(f"🤖 YOLO Results: {len(results)} result(s)")
-        if len(results) > 0:
-            print(f"   Boxes detected: {results[0].boxes is not None}")
-            if results[0].boxes is not None:
-                num_boxes = len(results[0].boxes)
-                print(f"   Number of boxes: {num_boxes}")
-                if num_boxes > 0:
-                    for i, box in enumerate(results[0].boxes):
-                        conf = float(box.conf[0].cpu().numpy())
-                        cls_id = int(box.cls[0].cpu().numpy())
-                        cls_name = self.model.names.get(cls_id, f"class_{cls_id}")
-                        print(f"   Box {i+1}: class={cls_name} (id={cls_id}), conf={conf:.3f}")
-                else:
-                    print(f"   ⚠️ Boxes object exists but is empty")
-            else:
-                print(f"   ⚠️ No boxes in results")
-
-        # Process results
         detections = []
-        annotated_frame = frame.copy()
-
         if len(results) > 0 and results[0].boxes is not None:
             boxes = results[0].boxes
-
-            for box in boxes:
-                x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
-                confidence = float(box.conf[0].cpu().numpy())
-                class_id = int(box.cls[0].cpu().numpy())
-                class_name = self.model.names[class_id]
-
-                width = x2 - x1
-                height = y2 - y1
-
+            for (x1, y1, x2, y2), confidence, class_id in zip(
+                boxes.xyxy.cpu().numpy(),
+                boxes.conf.cpu().numpy(),
+                boxes.cls.cpu().numpy().astype(int),
+            ):
                 detections.append(
                     {
-                        "class": class_name,
-                        "confidence": confidence,
-                        "bbox": [float(x1), float(y1), float(width), float(height)],
+                        "class": self.model.names[int(class_id)],
+                        "confidence": float(confidence),
+                        "bbox": [float(x1), float(y1), float(x2 - x1), float(y2 - y1)],
                     }
                 )
 
-                # Draw on frame
-                color = (0, 0, 255) if class_name == "pothole" else (0, 255, 0)
-                cv2.rectangle(
-                    annotated_frame, (int(x1), int(y1)), (int(x2), int(y2)), color, 2
-                )
-
-                label = f"{class_name} {confidence:.2f}"
-                (label_width, label_height), _ = cv2.getTextSize(
-                    label, cv2.FONT_HERSHEY_SIMPLEX, 0.5, 2
-                )
-                cv2.rectangle(
-                    annotated_frame,
-                    (int(x1), int(y1) - label_height - 10),
-                    (int(x1) + label_width, int(y1)),
-                    color,
-                    -1,
-                )
-                cv2.putText(
-                    annotated_frame,
-                    label,
-                    (int(x1), int(y1) - 5),
-                    cv2.FONT_HERSHEY_SIMPLEX,
-                    0.5,
-                    (255, 255, 255),
-                    2,
-                )
+        # Debug: Log model output
+        print(f"🤖 YOLO Results: {len(detections)} box(es)")
+        for i, det in enumerate(detections):
+            print(f"   Box {i+1}: class={det['class']}, conf={det['confidence']:.3f}")
 
+        annotated_frame = self.draw_detections(frame.copy(), detections)
         return annotated_frame, detections
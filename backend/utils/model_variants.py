@@ -0,0 +1,260 @@
+import json
+import shutil
+from pathlib import Path
+from typing import Dict, Iterator, Optional
+
+import config
+import cv2
+import numpy as np
+from ultralytics import YOLO
+
+# Reduced-precision variants that can be built from the FP32 weights.
+# "fp32" is the original PyTorch checkpoint and needs no export.
+MODEL_VARIANTS = ["fp32", "onnx", "onnx_int8", "openvino", "openvino_fp16"]
+
+
+def variant_path(model_path: str, variant: str) -> Path:
+    """
+    Get the on-disk location of an exported model variant.
+
+    Args:
+        model_path: Path to the FP32 YOLO model file (.pt)
+        variant: One of MODEL_VARIANTS
+
+    Returns:
+        Path of the exported file or directory for the variant
+    """
+    if variant not in MODEL_VARIANTS:
+        raise ValueError(
+            f"Unknown model variant '{variant}'. Supported: {MODEL_VARIANTS}"
+        )
+
+    weights = Path(model_path)
+    if variant == "fp32":
+        return weights
+    if variant == "onnx":
+        return weights.with_suffix(".onnx")
+    if variant == "onnx_int8":
+        return weights.with_name(f"{weights.stem}_int8.onnx")
+    if variant == "openvino":
+        return weights.with_name(f"{weights.stem}_openvino_model")
+    return weights.with_name(f"{weights.stem}_fp16_openvino_model")
+
+
+def _meta_path(target: Path) -> Path:
+    """Sidecar file recording what an exported variant was built from."""
+    return target.with_name(f"{target.name}.source.json")
+
+
+def _source_meta(model_path: str) -> Dict:
+    """Identity of the FP32 weights a variant is exported from."""
+    stat = Path(model_path).stat()
+    return {"source_size": stat.st_size, "source_mtime_ns": stat.st_mtime_ns}
+
+
+def _export_imgsz(model_path: str) -> int:
+    """Input size to export at: MODEL_IMGSZ, else the checkpoint's training size."""
+    if config.MODEL_IMGSZ:
+        return config.MODEL_IMGSZ
+    return YOLO(model_path).overrides.get("imgsz", 640)
+
+
+def variant_imgsz(model_path: str, variant: str) -> Optional[int]:
+    """
+    Get the input size an exported variant was built for.
+
+    Exported models have a fixed input shape, so they must be run at this
+    size. Returns None for fp32 or variants that have not been built yet.
+    """
+    meta_path = _meta_path(variant_path(model_path, variant))
+    if variant == "fp32" or not meta_path.exists():
+        return None
+    return json.loads(meta_path.read_text()).get("imgsz")
+
+
+def _is_stale(
+    model_path: str, target: Path, calibration_dir: Optional[str]
+) -> bool:
+    """Check an export against the current weights and settings."""
+    meta_path = _meta_path(target)
+    if not target.exists() or not meta_path.exists():
+        return True
+
+    meta = json.loads(meta_path.read_text())
+    expected = _source_meta(model_path)
+    if any(meta.get(key) != value for key, value in expected.items()):
+        print(f"⚠ {target.name} was built from different weights, rebuilding...")
+        return True
+    if meta.get("imgsz") != _export_imgsz(model_path):
+        print(f"⚠ {target.name} was built for imgsz {meta.get('imgsz')}, rebuilding...")
+        return True
+    if target.suffix == ".onnx" and "_int8" in target.stem:
+        if meta.get("calibration_dir") != (calibration_dir or None):
+            print(f"⚠ {target.name} used different calibration data, rebuilding...")
+            return True
+    return False
+
+
+def ensure_variant(
+    model_path: str,
+    variant: str,
+    calibration_dir: Optional[str] = None,
+    force: bool = False,
+) -> Path:
+    """
+    Build a model variant from the FP32 weights if it is missing or stale.
+
+    An export is rebuilt when the weights file, the input size (MODEL_IMGSZ,
+    else the checkpoint's training size) or the INT8 calibration directory
+    differ from the ones it was built with.
+
+    Args:
+        model_path: Path to the FP32 YOLO model file (.pt)
+        variant: One of MODEL_VARIANTS
+        calibration_dir: Optional directory of images used to calibrate
+            static INT8 quantization (dynamic quantization is used otherwise)
+        force: Rebuild the variant even if it is up to date
+
+    Returns:
+        Path of the exported variant, loadable with YOLO()
+    """
+    target = variant_path(model_path, variant)
+    if variant == "fp32":
+        return target
+    if not force and not _is_stale(model_path, target, calibration_dir):
+        return target
+
+    print(f"Building '{variant}' model variant from {model_path}...")
+
+    if variant == "onnx_int8":
+        fp32_onnx = ensure_variant(model_path, "onnx")
+        imgsz = variant_imgsz(model_path, "onnx")
+        _quantize_onnx(fp32_onnx, target, imgsz, calibration_dir)
+    else:
+        # Ultralytics names the export after the weights file, so FP16 is
+        # exported from a renamed copy to avoid clobbering the FP32 export
+        source = Path(model_path)
+        if variant == "openvino_fp16":
+            source = source.with_name(f"{source.stem}_fp16{source.suffix}")
+            shutil.copyfile(model_path, source)
+
+        if target.exists():
+            _remove(target)
+        try:
+            imgsz = _export_imgsz(model_path)
+            model = YOLO(str(source))
+            model.export(
+                format="onnx" if variant == "onnx" else "openvino",
+                imgsz=imgsz,
+                half=variant == "openvino_fp16",
+            )
+        finally:
+            if source != Path(model_path):
+                source.unlink()
+
+    _meta_path(target).write_text(
+        json.dumps(
+            {
+                **_source_meta(model_path),
+                "imgsz": imgsz,
+                "calibration_dir": calibration_dir or None,
+            }
+        )
+    )
+    print(f"Model variant saved to {target}")
+    return target
+
+
+def _quantize_onnx(
+    source: Path, target: Path, imgsz: int, calibration_dir: Optional[str] = None
+) -> None:
+    """Quantize an FP32 ONNX model to INT8, keeping YOLO metadata."""
+    try:
+        import onnx
+        from onnxruntime.quantization import (
+            CalibrationDataReader,
+            QuantFormat,
+            QuantType,
+            quantize_dynamic,
+            quantize_static,
+        )
+    except ImportError as e:
+        raise ImportError(
+            "INT8 quantization requires 'onnx' and 'onnxruntime'. "
+            "Install them with: pip install onnx onnxruntime"
+        ) from e
+
+    if calibration_dir:
+
+        class _ImageReader(CalibrationDataReader):
+            def __init__(self, input_name: str):
+                self.batches = (
+                    {input_name: blob}
+                    for blob in _calibration_blobs(calibration_dir, imgsz)
+                )
+
+            def get_next(self):
+                return next(self.batches, None)
+
+        input_name = onnx.load(str(source)).graph.input[0].name
+        quantize_static(
+            str(source),
+            str(target),
+            _ImageReader(input_name),
+            quant_format=QuantFormat.QDQ,
+            activation_type=QuantType.QUInt8,
+            weight_type=QuantType.QInt8,
+        )
+    else:
+        quantize_dynamic(str(source), str(target), weight_type=QuantType.QUInt8)
+
+    # Ultralytics reads class names, stride and imgsz from the ONNX metadata
+    src_model = onnx.load(str(source))
+    dst_model = onnx.load(str(target))
+    del dst_model.metadata_props[:]
+    dst_model.metadata_props.extend(src_model.metadata_props)
+    onnx.save(dst_model, str(target))
+
+
+def _calibration_blobs(calibration_dir: str, imgsz: int) -> Iterator[np.ndarray]:
+    """Yield preprocessed NCHW float blobs for INT8 calibration."""
+    files = sorted(
+        path
+        for path in Path(calibration_dir).rglob("*")
+        if path.suffix.lower() in config.SUPPORTED_IMAGE_FORMATS
+    )
+    if not files:
+        raise ValueError(f"No calibration images found in {calibration_dir}")
+
+    for path in files:
+        image = cv2.imread(str(path))
+        if image is None:
+            continue
+        yield _letterbox_blob(image, imgsz)
+
+
+def _letterbox_blob(image: np.ndarray, size: int) -> np.ndarray:
+    """Resize with padding to a square input, matching YOLO preprocessing."""
+    height, width = image.shape[:2]
+    scale = min(size / height, size / width)
+    new_w, new_h = int(round(width * scale)), int(round(height * scale))
+    resized = cv2.resize(image, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+
+    canvas = np.full((size, size, 3), 114, dtype=np.uint8)
+    top = (size - new_h) // 2
+    left = (size - new_w) // 2
+    canvas[top : top + new_h, left : left + new_w] = resized
+
+    blob = canvas[:, :, ::-1].transpose(2, 0, 1)  # BGR -> RGB, HWC -> CHW
+    return np.ascontiguousarray(blob[None], dtype=np.float32) / 255.0
+
+
+def _remove(path: Path) -> None:
+    """Remove a previously exported file or directory."""
+    if path.is_dir():
+        shutil.rmtree(path)
+    else:
+        path.unlink()
+    meta_path = _meta_path(path)
+    if meta_path.exists():
+        meta_path.unlink()
@@ -0,0 +1,100 @@
+import uuid
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+class ResultCache:
+    """
+    On-disk store of raw detection candidates for processed uploads.
+
+    Each entry holds the candidates produced by a single inference pass, so
+    the same image or video can be re-scored at new thresholds without
+    running the model again. Entries are .npz files in the output directory,
+    so they use no server memory and are removed by the regular cleanup of
+    old output files.
+    """
+
+    def __init__(self, directory: Path):
+        """
+        Create the store.
+
+        Args:
+            directory: Directory the candidate files are written to
+        """
+        self.directory = Path(directory)
+
+    def _path(self, result_id: str) -> Optional[Path]:
+        """File for a result id, or None if the id is not a valid UUID."""
+        try:
+            result_id = str(uuid.UUID(result_id))
+        except ValueError:
+            return None
+        return self.directory / f"{result_id}_candidates.npz"
+
+    def put(
+        self, result_id: str, kind: str, frames: List[Tuple[int, Dict[str, np.ndarray]]]
+    ):
+        """
+        Store the candidates for a processed image or video.
+
+        Args:
+            result_id: UUID of the processed upload
+            kind: "image" or "video"
+            frames: (frame_index, candidates) pairs; a single pair for images
+        """
+        path = self._path(result_id)
+        if path is None:
+            raise ValueError(f"Invalid result id: {result_id}")
+
+        tmp_path = path.with_suffix(".tmp")
+        with tmp_path.open("wb") as f:
+            np.savez(
+                f,
+                kind=np.array(kind),
+                frames=np.array([index for index, _ in frames], dtype=np.int64),
+                counts=np.array(
+                    [len(c["scores"]) for _, c in frames], dtype=np.int64
+                ),
+                boxes=np.concatenate(
+                    [c["boxes"] for _, c in frames] + [np.zeros((0, 4), np.float32)]
+                ),
+                scores=np.concatenate(
+                    [c["scores"] for _, c in frames] + [np.zeros(0, np.float32)]
+                ),
+                classes=np.concatenate(
+                    [c["classes"] for _, c in frames] + [np.zeros(0, np.int64)]
+                ),
+            )
+        tmp_path.replace(path)
+
+    def get(self, result_id: str) -> Optional[Dict]:
+        """
+        Load a stored result.
+
+        Returns:
+            Dict with "type" and "frames" as (frame_index, candidates) pairs,
+            or None if the result was never stored or has been cleaned up
+        """
+        path = self._path(result_id)
+        if path is None or not path.exists():
+            return None
+
+        with np.load(path) as data:
+            kind = str(data["kind"])
+            frame_indices, counts = data["frames"], data["counts"]
+            boxes, scores, classes = data["boxes"], data["scores"], data["classes"]
+
+        # Candidates are stored frame by frame, each frame a contiguous run
+        splits = np.cumsum(counts)[:-1]
+        frames = [
+            (int(frame_index), {"boxes": b, "scores": s, "classes": c})
+            for frame_index, b, s, c in zip(
+                frame_indices,
+                np.split(boxes, splits),
+                np.split(scores, splits),
+                np.split(classes, splits),
+            )
+        ]
+        return {"type": kind, "frames": frames}
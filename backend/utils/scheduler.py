@@ -0,0 +1,363 @@
+import asyncio
+import itertools
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, InvalidStateError
+from typing import Callable, Dict, Optional, Tuple
+
+import numpy as np
+
+# Priority classes, served strictly in this order
+LIVE = 0
+BATCH = 1
+PRIORITY_NAMES = {LIVE: "live", BATCH: "batch"}
+
+# Forget sessions that have been idle (and have nothing queued) this long
+CLIENT_IDLE_SECONDS = 300
+
+
+class RateLimitExceeded(Exception):
+    """Raised when live frames arrive faster than the session or host FPS cap."""
+
+    def __init__(self, retry_after: float):
+        super().__init__("Frame rate limit exceeded")
+        self.retry_after = retry_after
+
+
+class JobDropped(Exception):
+    """Raised for live jobs that were superseded or waited past their deadline."""
+
+
+class _TokenBucket:
+    """Token bucket used for the per-client FPS cap."""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def try_acquire(self) -> float:
+        """Take a token. Returns 0 on success, else seconds until one is free."""
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class _Job:
+    def __init__(self, key, priority, fn, args, start_tag, finish_tag, sequence):
+        self.key = key
+        self.priority = priority
+        self.fn = fn
+        self.args = args
+        self.start_tag = start_tag
+        self.finish_tag = finish_tag
+        self.sequence = sequence
+        self.enqueued_at = time.monotonic()
+        self.future = Future()
+
+    def fail(self, error: Exception):
+        """Resolve the job with an error unless the caller already gave up."""
+        try:
+            self.future.set_exception(error)
+        except InvalidStateError:
+            pass  # Cancelled (or resolved) concurrently by the caller
+
+
+class _ClientState:
+    def __init__(self, bucket: Optional[_TokenBucket]):
+        self.bucket = bucket
+        self.queues = {LIVE: deque(), BATCH: deque()}
+        self.last_finish = {LIVE: 0.0, BATCH: 0.0}
+        self.last_seen = time.monotonic()
+
+
+class _HostState:
+    def __init__(self, weight: float, bucket: Optional[_TokenBucket]):
+        self.weight = weight
+        self.bucket = bucket
+        self.last_finish = {LIVE: 0.0, BATCH: 0.0}
+
+
+class InferenceScheduler:
+    """
+    Fair scheduler for sharing a single detector between many clients.
+
+    Jobs are grouped by client session and priority class. A session is the
+    pair (remote host, client id), so a client id copied from another host
+    never touches the original client's queue or rate limit. Live (real-time)
+    jobs are always served before batch jobs.
+
+    Live sessions share inference capacity by weighted fair queuing, and are
+    also subject to an FPS cap per session and per host (so rotating client
+    ids does not raise a host's total rate), a small per-session queue that
+    keeps only the newest frames, and a deadline after which stale frames are
+    dropped, which bounds live latency when the server is oversubscribed.
+
+    Batch jobs are not rate limited, so they are fair-queued per host instead:
+    all sessions of a host share one batch slot in submission order, and new
+    client ids don't add shares. Weights are keyed on the host address for the
+    same reason.
+
+    All inference runs on one worker thread, so the model is never used
+    concurrently.
+    """
+
+    def __init__(
+        self,
+        max_fps: float = 0,
+        burst: float = 1,
+        host_max_fps: float = 0,
+        live_queue_depth: int = 2,
+        live_deadline_ms: float = 0,
+        weights: Optional[Dict[str, float]] = None,
+    ):
+        """
+        Create the scheduler.
+
+        Args:
+            max_fps: Per-session cap on live jobs per second (0 = unlimited)
+            burst: Number of live jobs a session may submit back-to-back
+            host_max_fps: Cap on live jobs per second across all sessions
+                from one remote host (0 = unlimited)
+            live_queue_depth: Live jobs queued per session before the oldest
+                is dropped
+            live_deadline_ms: Drop live jobs that waited longer than this
+                (0 = never drop)
+            weights: Fair-share weight per remote host address (default 1)
+        """
+        self.max_fps = max_fps
+        self.burst = max(burst, 1)
+        self.host_max_fps = host_max_fps
+        self.live_queue_depth = max(live_queue_depth, 1)
+        self.live_deadline = live_deadline_ms / 1000
+        self.weights = weights or {}
+
+        self._clients: Dict[Tuple[str, str], _ClientState] = {}
+        self._hosts: Dict[str, _HostState] = {}
+        self._virtual_time = {LIVE: 0.0, BATCH: 0.0}
+        self._latencies = {LIVE: deque(maxlen=1000), BATCH: deque(maxlen=1000)}
+        self._counters = {"completed": 0, "rate_limited": 0, "dropped": 0}
+        self._sequence = itertools.count()
+        self._last_prune = time.monotonic()
+        self._cond = threading.Condition()
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        """Start the inference worker thread."""
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+        self._thread = threading.Thread(target=self._worker, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the worker and fail any jobs still queued."""
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+        with self._cond:
+            for state in self._clients.values():
+                for jobs in state.queues.values():
+                    while jobs:
+                        jobs.popleft().fail(JobDropped("Scheduler is shutting down"))
+
+    def submit(
+        self, client_id: str, priority: int, fn: Callable, *args, host: str = ""
+    ) -> Future:
+        """
+        Queue a job for a client.
+
+        Args:
+            client_id: Session identity chosen by the client
+            priority: LIVE or BATCH
+            fn: Callable to run on the inference worker, called as fn(*args)
+            host: Remote address of the client
+
+        Returns:
+            concurrent.futures.Future resolving to fn's return value
+
+        Raises:
+            RateLimitExceeded: If a live job exceeds the session or host cap
+        """
+        with self._cond:
+            if not self._running:
+                raise RuntimeError("Scheduler is not running")
+
+            now = time.monotonic()
+            if now - self._last_prune > CLIENT_IDLE_SECONDS:
+                self._prune_idle(now)
+
+            host_state = self._hosts.get(host)
+            if host_state is None:
+                bucket = (
+                    _TokenBucket(self.host_max_fps, self.host_max_fps)
+                    if self.host_max_fps
+                    else None
+                )
+                host_state = _HostState(self.weights.get(host, 1.0), bucket)
+                self._hosts[host] = host_state
+
+            key = (host, client_id)
+            state = self._clients.get(key)
+            if state is None:
+                bucket = (
+                    _TokenBucket(self.max_fps, self.burst) if self.max_fps else None
+                )
+                state = _ClientState(bucket)
+                self._clients[key] = state
+            state.last_seen = now
+
+            if priority == LIVE:
+                self._check_rate(state, host_state)
+
+            # Weighted fair queuing: each job costs 1/weight of virtual time.
+            # Live work is tagged per session, batch work per host.
+            tagged = state if priority == LIVE else host_state
+            start_tag = max(self._virtual_time[priority], tagged.last_finish[priority])
+            finish_tag = start_tag + 1.0 / host_state.weight
+            tagged.last_finish[priority] = finish_tag
+            job = _Job(
+                key, priority, fn, args, start_tag, finish_tag, next(self._sequence)
+            )
+
+            jobs = state.queues[priority]
+            jobs.append(job)
+            if priority == LIVE and len(jobs) > self.live_queue_depth:
+                # A newer frame supersedes the oldest one still waiting
+                stale = jobs.popleft()
+                self._counters["dropped"] += 1
+                stale.fail(JobDropped("Superseded by a newer frame"))
+
+            self._cond.notify()
+            return job.future
+
+    def _check_rate(self, state: _ClientState, host_state: _HostState):
+        """Apply the session and host FPS caps. Caller holds the lock."""
+        for bucket in (state.bucket, host_state.bucket):
+            if bucket:
+                retry_after = bucket.try_acquire()
+                if retry_after:
+                    self._counters["rate_limited"] += 1
+                    raise RateLimitExceeded(retry_after)
+
+    async def run(self, client_id: str, priority: int, fn: Callable, *args, host=""):
+        """Submit a job and await its result from async code."""
+        future = self.submit(client_id, priority, fn, *args, host=host)
+        return await asyncio.wrap_future(future)
+
+    def run_sync(self, client_id: str, priority: int, fn: Callable, *args, host=""):
+        """Submit a job and block the calling thread until it completes."""
+        return self.submit(client_id, priority, fn, *args, host=host).result()
+
+    def _next_job(self) -> Optional[_Job]:
+        """Pick the next job: strict priority, then smallest finish tag."""
+        for priority in (LIVE, BATCH):
+            best = None
+            for state in self._clients.values():
+                jobs = state.queues[priority]
+                if jobs and (
+                    best is None
+                    or (jobs[0].finish_tag, jobs[0].sequence)
+                    < (best.finish_tag, best.sequence)
+                ):
+                    best = jobs[0]
+            if best is not None:
+                self._clients[best.key].queues[priority].popleft()
+                self._virtual_time[priority] = best.start_tag
+                return best
+        return None
+
+    def _worker(self):
+        """Inference worker loop."""
+        while True:
+            with self._cond:
+                job = self._next_job()
+                while job is None and self._running:
+                    self._cond.wait()
+                    job = self._next_job()
+                if job is None:
+                    return
+
+            waited = time.monotonic() - job.enqueued_at
+            if job.priority == LIVE and self.live_deadline and waited > self.live_deadline:
+                with self._cond:
+                    self._counters["dropped"] += 1
+                job.fail(
+                    JobDropped(f"Frame waited {waited * 1000:.0f} ms, past its deadline")
+                )
+                continue
+
+            # Once running, the future can no longer be cancelled
+            if not job.future.set_running_or_notify_cancel():
+                continue
+            try:
+                job.future.set_result(job.fn(*job.args))
+            except Exception as e:
+                job.future.set_exception(e)
+
+            with self._cond:
+                self._latencies[job.priority].append(time.monotonic() - job.enqueued_at)
+                self._counters["completed"] += 1
+
+    def _prune_idle(self, now: float):
+        """Forget idle sessions with nothing queued. Caller holds the lock."""
+        self._last_prune = now
+        active_hosts = set()
+        for key, state in list(self._clients.items()):
+            idle = now - state.last_seen > CLIENT_IDLE_SECONDS
+            if idle and not any(state.queues.values()):
+                del self._clients[key]
+            else:
+                active_hosts.add(key[0])
+        for host in list(self._hosts):
+            if host not in active_hosts:
+                del self._hosts[host]
+
+    def stats(self) -> Dict:
+        """Aggregate queue depths, counters and latency percentiles."""
+        with self._cond:
+            latency = {}
+            for priority, samples in self._latencies.items():
+                values = np.array(samples) * 1000 if samples else None
+                latency[PRIORITY_NAMES[priority]] = {
+                    "p50_ms": float(np.percentile(values, 50)) if samples else None,
+                    "p99_ms": float(np.percentile(values, 99)) if samples else None,
+                }
+
+            return {
+                "running": self._running,
+                "latency": latency,
+                "clients": len(self._clients),
+                "queued_live": sum(
+                    len(state.queues[LIVE]) for state in self._clients.values()
+                ),
+                "queued_batch": sum(
+                    len(state.queues[BATCH]) for state in self._clients.values()
+                ),
+                **self._counters,
+            }
+
+
+def parse_host_weights(spec: str) -> Dict[str, float]:
+    """Parse a "host:weight,host:weight" string into a dict."""
+    weights = {}
+    for item in spec.split(","):
+        if ":" not in item:
+            continue
+        # rsplit keeps IPv6 addresses intact
+        host, weight = item.rsplit(":", 1)
+        if float(weight) > 0:
+            weights[host.strip()] = float(weight)
+    return weights
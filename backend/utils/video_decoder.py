@@ -0,0 +1,143 @@
+import queue
+import threading
+from typing import Iterator, Tuple
+
+import cv2
+import numpy as np
+
+_END_OF_STREAM = object()
+
+
+class VideoDecoder:
+    """
+    Threaded video decoder with frame-stride sampling and decode-time resizing.
+
+    Frames are decoded on a background thread so decoding overlaps with
+    inference. Skipped frames are grabbed but never retrieved, which still
+    decodes them but skips the conversion to a BGR image. Kept frames are
+    downscaled on the decode thread (after a full-resolution decode) before
+    they are handed out, so the consumer never touches full-size frames.
+    """
+
+    def __init__(
+        self,
+        video_path: str,
+        frame_stride: int = 1,
+        max_width: int = 0,
+        threads: int = 0,
+        queue_size: int = 32,
+    ):
+        """
+        Open a video for decoding.
+
+        Args:
+            video_path: Path to the input video file
+            frame_stride: Decode every Nth frame (1 = every frame)
+            max_width: Downscale frames wider than this (0 = keep source size)
+            threads: FFmpeg decoder threads (0 = one per CPU core)
+            queue_size: Maximum number of decoded frames buffered ahead
+        """
+        if frame_stride < 1:
+            raise ValueError(f"frame_stride must be >= 1, got {frame_stride}")
+
+        self.cap = self._open(video_path, threads)
+        if not self.cap.isOpened():
+            raise ValueError(f"Failed to open video from {video_path}")
+
+        self.frame_stride = frame_stride
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS)
+        self.width = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        self.height = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        self.total_frames = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT))
+
+        # Decoded frame size, keeping the source aspect ratio
+        self.output_size = (self.width, self.height)
+        if max_width and self.width > max_width:
+            self.output_size = (
+                max_width,
+                max(1, int(round(self.height * max_width / self.width))),
+            )
+
+        # Per-axis factors from source to decoded coordinates (height is
+        # rounded separately, so the two can differ slightly)
+        self.scale_x = self.output_size[0] / self.width if self.width else 1.0
+        self.scale_y = self.output_size[1] / self.height if self.height else 1.0
+
+        self._frames = queue.Queue(maxsize=queue_size)
+        self._stop = threading.Event()
+        self._error = None
+        self._thread = threading.Thread(target=self._decode_loop, daemon=True)
+        self._thread.start()
+
+    @staticmethod
+    def _open(video_path: str, threads: int) -> cv2.VideoCapture:
+        """Open the capture, requesting multi-threaded decode where supported."""
+        if hasattr(cv2, "CAP_PROP_N_THREADS"):
+            cap = cv2.VideoCapture(
+                video_path, cv2.CAP_FFMPEG, [cv2.CAP_PROP_N_THREADS, threads]
+            )
+            if cap.isOpened():
+                return cap
+        return cv2.VideoCapture(video_path)
+
+    def _decode_loop(self):
+        """Background thread: grab/retrieve frames and push them to the queue."""
+        frame_index = 0
+        try:
+            while not self._stop.is_set():
+                if frame_index % self.frame_stride:
+                    # Skipped frame: grab() still decodes it (FFmpeg), but
+                    # without retrieve() there is no conversion to BGR
+                    if not self.cap.grab():
+                        break
+                else:
+                    ret, frame = self.cap.read()
+                    if not ret:
+                        break
+                    if self.output_size != (self.width, self.height):
+                        frame = cv2.resize(
+                            frame, self.output_size, interpolation=cv2.INTER_AREA
+                        )
+                    self._put((frame_index, frame))
+                frame_index += 1
+        except Exception as e:
+            self._error = e
+        finally:
+            self._put(_END_OF_STREAM)
+
+    def _put(self, item):
+        """Queue an item, giving up if the consumer has closed the decoder."""
+        while not self._stop.is_set():
+            try:
+                self._frames.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def __iter__(self) -> Iterator[Tuple[int, np.ndarray]]:
+        """
+        Iterate over decoded frames.
+
+        Yields:
+            Tuple of (source_frame_index, frame) where frame is already resized
+        """
+        while True:
+            item = self._frames.get()
+            if item is _END_OF_STREAM:
+                break
+            yield item
+
+        if self._error is not None:
+            raise self._error
+
+    def release(self):
+        """Stop the decode thread and release the capture."""
+        self._stop.set()
+        self._thread.join()
+        self.cap.release()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
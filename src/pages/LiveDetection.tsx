@@ -16,6 +16,7 @@ const LiveDetection = () => {
   const currentDetectionsRef = useRef<any[]>([]); // Store detections in ref for immediate access
   const isDetectingRef = useRef(false); // Prevent multiple detection requests
   const abortControllerRef = useRef<AbortController | null>(null); // For canceling fetch requests
+  const clientIdRef = useRef(crypto.randomUUID()); // Session identity for fair scheduling on the backend
 
   const startCamera = async () => {
     try {
@@ -174,6 +175,7 @@ const LiveDetection = () => {
           try {
             const response = await fetch("http://localhost:8000/api/detect/frame", {
               method: "POST",
+              headers: { "X-Client-ID": clientIdRef.current },
               body: formData,
               signal: abortControllerRef.current.signal, // Add abort signal
             });